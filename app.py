@@ -1,37 +1,206 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from routers import videos, keywords, stories
-from supabase import create_client
-from utils.middleware import RateLimitMiddleware
+from routers import videos, keywords, stories, metrics, channels
+from supabase import acreate_client
+from utils.middleware import RateLimitMiddleware, RateLimitPolicy
+from utils.metrics import MetricsMiddleware, registry, stats_samples
+from utils.responses import TimedJSONResponse
+from utils.supabase_vector import SupabaseVectorDB, refresh_local_index_periodically
+from utils.embedding_cache import EmbeddingCache
+from utils.ai_client import AIClient
+from utils.jobs import JobQueue, InMemoryJobBackend
+from utils.cache import TTLCache
+from services.story_service import make_story_job_handler
+from services.feed_service import load_feed_catalog, refresh_catalog_periodically
+from utils.blocked_sets import BlockedVideoSets
+from utils.channel_catalog import ChannelCatalog
+from utils import concurrency
 from config.logger import logger
-from config.settings import RATE_LIMIT_DURATION, RATE_LIMIT_MAX_REQUESTS
+from config.settings import (
+    RATE_LIMIT_DURATION,
+    RATE_LIMIT_MAX_REQUESTS,
+    STORY_JOB_POLL_MAX_REQUESTS,
+    DB_CONNECTION_STRING,
+    COLLECTION_NAME,
+    KEYWORD_COLLECTION_NAME,
+    VECTOR_DB_POOL_SIZE,
+    VECTOR_DB_MAX_OVERFLOW,
+    VECTOR_DB_POOL_TIMEOUT,
+    VECTOR_DB_POOL_RECYCLE,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    OPENAI_API_KEY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_EMBEDDING_CONCURRENCY,
+    OPENAI_CHAT_CONCURRENCY,
+    OPENAI_TTS_CONCURRENCY,
+    OPENAI_EMBEDDING_TIMEOUT,
+    OPENAI_CHAT_TIMEOUT,
+    OPENAI_TTS_TIMEOUT,
+    VECTOR_LOCAL_INDEX,
+    VECTOR_LOCAL_INDEX_PROBES,
+    VECTOR_LOCAL_INDEX_REFRESH,
+    STORY_JOB_WORKERS,
+    STORY_JOB_QUEUE_SIZE,
+    STORY_JOB_RESULT_TTL,
+    FEED_CACHE_TTL,
+    FEED_CACHE_MAX_ENTRIES,
+    FEED_CACHE_MAX_ROWS,
+    FEED_MATERIALIZED,
+    FEED_MATERIALIZED_MAX_USERS,
+    FEED_CATALOG_REFRESH,
+    CHANNEL_CATALOG_TTL,
+    KEYWORD_REGISTRY_MAX_ENTRIES,
+    KEYWORD_REGISTRY_TTL,
+    SLOW_REQUEST_THRESHOLD_MS,
+    SYNC_THREAD_POOL_SIZE
+)
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.supabase = create_client(
+    # Blocking calls that remain (vecs, SQLite) run in this bounded pool, off the event loop
+    concurrency.configure(int(SYNC_THREAD_POOL_SIZE))
+    app.state.supabase = await acreate_client(
         os.getenv("SUPABASE_URL"),
         os.getenv("SUPABASE_KEY")
     )
     logger.info("Supabase client initialized")
+    app.state.vector_db = SupabaseVectorDB(
+        db_connection=DB_CONNECTION_STRING,
+        collection_name=COLLECTION_NAME,
+        dimension=1536,
+        pool_size=int(VECTOR_DB_POOL_SIZE),
+        max_overflow=int(VECTOR_DB_MAX_OVERFLOW),
+        pool_timeout=int(VECTOR_DB_POOL_TIMEOUT),
+        pool_recycle=int(VECTOR_DB_POOL_RECYCLE)
+    )
+    logger.info(f"Vector DB client initialized ({app.state.vector_db.pool_status()})")
+    local_index_refresh = None
+    if VECTOR_LOCAL_INDEX:
+        app.state.vector_db.enable_local_index(
+            mode=VECTOR_LOCAL_INDEX,
+            n_probe=int(VECTOR_LOCAL_INDEX_PROBES)
+        )
+        # Vectors written by the ingestion CLI or other workers only reach this index through the refresh
+        if float(VECTOR_LOCAL_INDEX_REFRESH) > 0:
+            local_index_refresh = asyncio.create_task(refresh_local_index_periodically(
+                app.state.vector_db,
+                interval=float(VECTOR_LOCAL_INDEX_REFRESH)
+            ))
+    # Keyword embeddings, matched against newly ingested videos; only written when a keyword is blocked
+    app.state.keyword_db = SupabaseVectorDB(
+        db_connection=DB_CONNECTION_STRING,
+        collection_name=KEYWORD_COLLECTION_NAME,
+        dimension=1536,
+        pool_size=2,
+        max_overflow=2,
+        pool_timeout=int(VECTOR_DB_POOL_TIMEOUT),
+        pool_recycle=int(VECTOR_DB_POOL_RECYCLE)
+    )
+    app.state.embedding_cache = EmbeddingCache(
+        path=EMBEDDING_CACHE_PATH or None,
+        max_entries=int(EMBEDDING_CACHE_MAX_ENTRIES)
+    )
+    app.state.ai_client = AIClient(
+        api_key=OPENAI_API_KEY,
+        max_connections=int(OPENAI_MAX_CONNECTIONS),
+        embedding_concurrency=int(OPENAI_EMBEDDING_CONCURRENCY),
+        chat_concurrency=int(OPENAI_CHAT_CONCURRENCY),
+        tts_concurrency=int(OPENAI_TTS_CONCURRENCY),
+        embedding_timeout=float(OPENAI_EMBEDDING_TIMEOUT),
+        chat_timeout=float(OPENAI_CHAT_TIMEOUT),
+        tts_timeout=float(OPENAI_TTS_TIMEOUT),
+        embedding_cache=app.state.embedding_cache
+    )
+    logger.info("OpenAI client initialized")
+    app.state.job_queue = JobQueue(
+        InMemoryJobBackend(
+            max_queue_size=int(STORY_JOB_QUEUE_SIZE),
+            result_ttl=int(STORY_JOB_RESULT_TTL)
+        ),
+        workers=int(STORY_JOB_WORKERS)
+    )
+    app.state.job_queue.register("story", make_story_job_handler(app.state.supabase, app.state.ai_client))
+    await app.state.job_queue.start()
+    app.state.feed_cache = TTLCache(
+        max_entries=int(FEED_CACHE_MAX_ENTRIES),
+        ttl=float(FEED_CACHE_TTL),
+        max_weight=int(FEED_CACHE_MAX_ROWS)
+    )
+    # Normalized word -> keyword id and match count, for words whose links are already stored
+    app.state.keyword_registry = TTLCache(
+        max_entries=int(KEYWORD_REGISTRY_MAX_ENTRIES),
+        ttl=float(KEYWORD_REGISTRY_TTL)
+    )
+    async def load_channels():
+        response = await app.state.supabase.table('channels').select('id, name, description, external_id').order('id').execute()
+        return response.data
+
+    app.state.channel_catalog = ChannelCatalog(
+        loader=load_channels,
+        ttl=float(CHANNEL_CATALOG_TTL)
+    )
+    app.state.blocked_sets = None
+    catalog_refresh = None
+    if FEED_MATERIALIZED.lower() == "true":
+        app.state.blocked_sets = BlockedVideoSets(
+            await load_feed_catalog(app.state.supabase),
+            max_users=int(FEED_MATERIALIZED_MAX_USERS)
+        )
+        catalog_refresh = asyncio.create_task(refresh_catalog_periodically(
+            app.state.blocked_sets,
+            app.state.supabase,
+            interval=float(FEED_CATALOG_REFRESH)
+        ))
+    registry.register_gauges("embedding_cache", lambda: stats_samples("cache", {"cache": "embedding"}, app.state.embedding_cache.stats()))
+    registry.register_gauges("feed_cache", lambda: stats_samples("cache", {"cache": "feed"}, app.state.feed_cache.stats()))
+    registry.register_gauges("keyword_registry", lambda: stats_samples("cache", {"cache": "keyword_registry"}, app.state.keyword_registry.stats()))
+    registry.register_gauges("blocked_sets", lambda: stats_samples("blocked_sets", {}, app.state.blocked_sets.stats() if app.state.blocked_sets else None))
     yield
     logger.info("Shutting down")
+    if catalog_refresh is not None:
+        catalog_refresh.cancel()
+    if local_index_refresh is not None:
+        local_index_refresh.cancel()
+    await app.state.job_queue.stop()
+    await app.state.ai_client.close()
+    app.state.embedding_cache.close()
+    app.state.vector_db.close()
+    app.state.keyword_db.close()
+    concurrency.shutdown()
 
 app = FastAPI(
     title="Reo API",
     description="API for managing reo app",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
 # Include the routers
 app.include_router(videos.router)
 app.include_router(keywords.router)
 app.include_router(stories.router)
+app.include_router(channels.router)
+app.include_router(metrics.router)
+
+@app.get("/health", tags=["health"])
+async def health():
+    vector_db_ok = await concurrency.run_sync(app.state.vector_db.health_check)
+    return {
+        "status": "ok" if vector_db_ok else "degraded",
+        "vector_db": vector_db_ok,
+        "embedding_cache": app.state.embedding_cache.stats(),
+        "feed_cache": app.state.feed_cache.stats(),
+        "blocked_sets": app.state.blocked_sets.stats() if app.state.blocked_sets else None,
+        "local_index": app.state.vector_db.local_index.stats() if app.state.vector_db.local_index else None
+    }
 
 # Add middlewares
 app.add_middleware(
@@ -42,12 +211,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Apply rate limiting only to stories routes
+# Apply rate limiting only to stories routes. Job polling gets its own, looser
+# bucket so waiting for a story does not spend the story-creation budget.
 app.add_middleware(
     RateLimitMiddleware,
-    rate_limit_duration=int(RATE_LIMIT_DURATION),
-    max_requests=int(RATE_LIMIT_MAX_REQUESTS),
-    include_paths=["/stories"]  # Apply only to paths starting with /stories
+    policies=[
+        RateLimitPolicy("/stories", max_requests=int(RATE_LIMIT_MAX_REQUESTS), duration=int(RATE_LIMIT_DURATION)),
+        RateLimitPolicy("/stories/jobs", max_requests=int(STORY_JOB_POLL_MAX_REQUESTS), duration=60)
+    ]
+)
+
+# Outermost middleware, so latency includes rate limiting and CORS handling
+app.add_middleware(
+    MetricsMiddleware,
+    slow_request_threshold=float(SLOW_REQUEST_THRESHOLD_MS) / 1000 if SLOW_REQUEST_THRESHOLD_MS else None
 )
 
 logger.info("Application startup complete")
@@ -0,0 +1,146 @@
+"""
+Recall@k against latency for approximate vector search settings.
+
+    python -m benchmarks.bench_ann_recall                      # synthetic, local IVF index
+    python -m benchmarks.bench_ann_recall --db postgresql://... --method hnsw --m 16 --ef-construction 64
+
+Results of each setting are compared with exact search over the same vectors.
+Without --db, the approximate side is utils.vector_index.LocalVectorIndex in
+IVF mode, swept over n_probe. With --db, the vectors are loaded into a
+scratch pgvector collection that is dropped afterwards. The collection is
+indexed with SupabaseVectorDB.create_index and the sweep covers ef_search
+(hnsw) or probes (ivfflat).
+"""
+import argparse
+import time
+import uuid
+from typing import Callable, List, Sequence
+import numpy as np
+from utils.vector_index import LocalVectorIndex
+
+
+def make_dataset(n: int, n_queries: int, dimension: int, n_clusters: int, seed: int):
+    """Clustered gaussian vectors, so an IVF or HNSW index has structure to exploit."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n + n_queries)
+    data = centers[labels] + 1.5 * rng.standard_normal((n + n_queries, dimension)).astype(np.float32)
+    return data[:n], data[n:]
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = []
+    for query in queries:
+        scores = normalized @ (query / np.linalg.norm(query))
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def measure(search: Callable[[np.ndarray], Sequence[int]], queries: np.ndarray, truth: List[set], k: int) -> dict:
+    for query in queries[:min(10, len(queries))]:
+        search(query)
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected.intersection(found))
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "recall": hits / (k * len(queries)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "qps": len(queries) / sum(latencies)
+    }
+
+
+def print_header():
+    print(f"{'setting':<20} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'qps':>8}")
+
+
+def print_row(setting: str, stats: dict):
+    print(f"{setting:<20} {stats['recall']:>9.3f} {stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['qps']:>8.0f}")
+
+
+def run_local(args, vectors: np.ndarray, queries: np.ndarray, truth: List[set]):
+    records = [(str(i), vector, {}) for i, vector in enumerate(vectors)]
+    exact = LocalVectorIndex(args.dimension, mode="exact")
+    exact.load(records)
+    approximate = LocalVectorIndex(args.dimension, mode="approximate", n_lists=args.n_lists)
+    start = time.perf_counter()
+    approximate.load(records)
+    print(f"trained {approximate.stats()['lists']} IVF lists in {time.perf_counter() - start:.1f}s\n")
+    print_header()
+
+    def search(index, **kwargs):
+        return lambda query: [int(i) for i in index.query(query, limit=args.k, include_value=False, include_metadata=False, **kwargs)]
+
+    print_row("exact", measure(search(exact), queries, truth, args.k))
+    for n_probe in args.sweep or [1, 2, 4, 8, 16, 32]:
+        print_row(f"n_probe={n_probe}", measure(search(approximate, n_probe=n_probe), queries, truth, args.k))
+
+
+def run_pgvector(args, vectors: np.ndarray, queries: np.ndarray, truth: List[set]):
+    from utils.supabase_vector import SupabaseVectorDB
+
+    name = f"bench_ann_{uuid.uuid4().hex[:8]}"
+    db = SupabaseVectorDB(db_connection=args.db, collection_name=name, dimension=args.dimension)
+    try:
+        db.add_vectors(((str(i), vector.tolist(), {}) for i, vector in enumerate(vectors)), batch_size=1000)
+
+        def search(**kwargs):
+            return lambda query: [int(i) for i in db.query_vectors(
+                query.tolist(), limit=args.k, include_value=False, include_metadata=False, **kwargs
+            )]
+
+        start = time.perf_counter()
+        db.create_index(
+            method=args.method,
+            m=args.m if args.method == "hnsw" else None,
+            ef_construction=args.ef_construction if args.method == "hnsw" else None,
+            n_lists=args.n_lists if args.method == "ivfflat" else None
+        )
+        print(f"built {args.method} index in {time.perf_counter() - start:.1f}s\n")
+        print_header()
+        if args.method == "hnsw":
+            for ef_search in args.sweep or [10, 20, 40, 80, 160, 320]:
+                if ef_search >= args.k:
+                    print_row(f"ef_search={ef_search}", measure(search(ef_search=ef_search), queries, truth, args.k))
+        else:
+            for probes in args.sweep or [1, 2, 4, 8, 16, 32]:
+                print_row(f"probes={probes}", measure(search(probes=probes), queries, truth, args.k))
+    finally:
+        db.client.delete_collection(name)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="PostgreSQL connection string with pgvector; omit for the local index")
+    parser.add_argument("--method", choices=["hnsw", "ivfflat"], default="hnsw", help="Index method (with --db)")
+    parser.add_argument("--m", type=int, default=16, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, default=64, help="HNSW build candidate list size")
+    parser.add_argument("--n-lists", type=int, default=None, help="IVF lists (default: sqrt of the vector count)")
+    parser.add_argument("--sweep", type=int, nargs="+", help="ef_search / probes values to try")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.method == "ivfflat" and args.n_lists is None:
+        args.n_lists = max(1, int(np.sqrt(args.vectors)))
+
+    vectors, queries = make_dataset(args.vectors, args.queries, args.dimension, args.clusters, args.seed)
+    truth = exact_neighbours(vectors, queries, args.k)
+    print(f"{args.vectors} vectors, {args.queries} queries, dimension {args.dimension}, k={args.k}")
+    if args.db:
+        run_pgvector(args, vectors, queries, truth)
+    else:
+        run_local(args, vectors, queries, truth)
+
+
+if __name__ == "__main__":
+    main()
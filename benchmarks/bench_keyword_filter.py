@@ -0,0 +1,106 @@
+"""
+Compare the old per-keyword substring filter with the prepared catalog + Aho–Corasick
+matcher used by VideoService.get_allowed_videos.
+
+    python -m benchmarks.bench_keyword_filter --videos 100000 --keywords 100 300 1000
+    python -m benchmarks.bench_keyword_filter --crossover
+
+--crossover times KeywordMatcher's two strategies (substring checks and the
+DFA) over the same prepared texts for growing keyword counts, to place
+utils.keyword_matcher.SMALL_KEYWORD_SET.
+"""
+import argparse
+import random
+import string
+import time
+from collections import namedtuple
+from utils.keyword_matcher import KeywordMatcher, PreparedCatalog, get_matcher
+
+Video = namedtuple("Video", "id channel_id title description")
+
+
+def make_catalog(n_videos: int, vocab_size: int, seed: int):
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(vocab_size)]
+    videos = [
+        Video(
+            id=i,
+            channel_id=rng.randrange(200),
+            title=" ".join(rng.choices(vocab, k=8)).title(),
+            description=" ".join(rng.choices(vocab, k=30))
+        )
+        for i in range(n_videos)
+    ]
+    return videos, vocab
+
+
+def naive_filter(videos, blocked_channels, blocked_keywords):
+    return [
+        video for video in videos
+        if video.channel_id not in blocked_channels and
+        not any(keyword in video.title.lower() or keyword in video.description.lower()
+                for keyword in blocked_keywords)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def sample_keywords(rng: random.Random, vocab, n_keywords: int):
+    # Half real words, half words that never occur, like a typical block list
+    return rng.sample(vocab, n_keywords // 2) + [w + "zq" for w in rng.sample(vocab, n_keywords - n_keywords // 2)]
+
+
+def crossover(catalog: PreparedCatalog, vocab, counts, rng: random.Random, repeats: int = 3):
+    print(f"{'keywords':>8} {'substring s':>12} {'dfa s':>8} {'dfa speedup':>12}")
+    for n_keywords in counts:
+        keywords = sample_keywords(rng, vocab, n_keywords)
+        times = []
+        for small_set in (n_keywords + 1, 0):
+            matches = KeywordMatcher(keywords, small_set=small_set).matches
+            times.append(min(timed(lambda: [matches(text) for text in catalog.texts])[1] for _ in range(repeats)))
+        print(f"{n_keywords:>8} {times[0]:>12.3f} {times[1]:>8.3f} {times[0] / times[1]:>11.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100000)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 300, 1000])
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-naive", action="store_true", help="Only time the matcher")
+    parser.add_argument("--crossover", action="store_true",
+                        help="Time substring checks against the DFA for 8..256 keywords (or --keywords)")
+    args = parser.parse_args()
+
+    videos, vocab = make_catalog(args.videos, args.vocab, args.seed)
+    catalog, prepare_time = timed(lambda: PreparedCatalog(videos))
+    print(f"catalog: {len(videos)} videos, prepared in {prepare_time * 1000:.0f} ms (once per load)")
+
+    rng = random.Random(args.seed + 1)
+    if args.crossover:
+        counts = args.keywords if args.keywords != parser.get_default("keywords") else [8, 16, 32, 48, 64, 80, 96, 112, 128, 160, 192, 256]
+        crossover(catalog, vocab, counts, rng)
+        return
+
+    print(f"{'keywords':>8} {'naive s':>9} {'matcher s':>10} {'build ms':>9} {'speedup':>8} {'allowed':>8}")
+    blocked_channels = set(rng.sample(range(200), 5))
+    for n_keywords in args.keywords:
+        keywords = sample_keywords(rng, vocab, n_keywords)
+
+        _, build_time = timed(lambda: get_matcher(keywords))
+        fast, fast_time = timed(lambda: catalog.filter(blocked_channels, keywords))
+        if args.skip_naive:
+            print(f"{n_keywords:>8} {'-':>9} {fast_time:>10.2f} {build_time * 1000:>9.1f} {'-':>8} {len(fast):>8}")
+            continue
+
+        slow, slow_time = timed(lambda: naive_filter(videos, blocked_channels, keywords))
+        assert [v.id for v in slow] == [v.id for v in fast], "matcher disagrees with naive filter"
+        print(f"{n_keywords:>8} {slow_time:>9.2f} {fast_time:>10.2f} {build_time * 1000:>9.1f} {slow_time / fast_time:>7.1f}x {len(fast):>8}")
+
+
+if __name__ == "__main__":
+    main()
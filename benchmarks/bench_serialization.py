@@ -0,0 +1,120 @@
+"""
+Throughput per core of the default response path versus the fast path
+(utils.responses) for a feed-sized list response.
+
+    python -m benchmarks.bench_serialization --rows 100 --requests 2000
+
+Both routes run in one process on one event loop, so requests/second is
+per core. HTTP is handled in-process through httpx's ASGI transport.
+Before measuring, the feed and /stories payloads of both paths are checked
+to be identical.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import List
+import httpx
+from fastapi import FastAPI
+from models.stories import GeneratedStory
+from models.videos import AllowedVideo
+from utils.responses import FastJSONResponse, project_rows
+
+
+def make_rows(n: int) -> List[dict]:
+    return [
+        {
+            "video_id": str(uuid.uuid4()),
+            "external_id": f"yt{i:08d}",
+            "title": f"Ben and Holly's Magical Adventures {i}",
+            "description": "A gentle story about friendship and helping others. " * 3,
+            "channel_name": "Ben and Holly",
+            "thumbnail_url": f"https://i.ytimg.com/vi/yt{i:08d}/hqdefault.jpg",
+            "created_at": "2024-07-21T10:00:00+00:00"
+        }
+        for i in range(n)
+    ]
+
+
+def make_story_rows(n: int) -> List[dict]:
+    # Timestamps as PostgREST returns them: trailing zeros of the fraction trimmed
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "topic": f"A trip to the moon {i}",
+            "characters": ["Ben", "Holly"],
+            "duration": 5,
+            "story_text": "Once upon a time, Ben and Holly flew to the moon. " * 20,
+            "audio_url": f"https://example.supabase.co/storage/v1/object/public/stories/{i}.mp3",
+            "created_at": f"2024-07-21T10:00:{i % 60:02d}.{i % 1000:03d}45+00:00",
+            "cache_key": None
+        }
+        for i in range(n)
+    ]
+
+
+def build_app(rows: List[dict], story_rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default", response_model=List[AllowedVideo])
+    async def default_path():
+        return [AllowedVideo(**row) for row in rows]
+
+    @app.get("/fast")
+    async def fast_path():
+        return FastJSONResponse(project_rows(rows, AllowedVideo))
+
+    @app.get("/stories/default", response_model=List[GeneratedStory])
+    async def default_stories():
+        return [GeneratedStory(**row) for row in story_rows]
+
+    @app.get("/stories/fast")
+    async def fast_stories():
+        return FastJSONResponse(project_rows(story_rows, GeneratedStory))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, n_requests: int) -> float:
+    for _ in range(min(50, n_requests)):
+        await client.get(path)
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        response = await client.get(path)
+        response.raise_for_status()
+    return n_requests / (time.perf_counter() - start)
+
+
+async def run(rows_count: int, n_requests: int):
+    rows = make_rows(rows_count)
+    app = build_app(rows, make_story_rows(rows_count))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        default_body = (await client.get("/default")).json()
+        fast_body = (await client.get("/fast")).json()
+        assert default_body == fast_body, "fast path changed the feed payload"
+        default_stories = (await client.get("/stories/default")).json()
+        fast_stories = (await client.get("/stories/fast")).json()
+        assert default_stories == fast_stories, "fast path changed the /stories payload"
+
+        default_rps = await measure(client, "/default", n_requests)
+        fast_rps = await measure(client, "/fast", n_requests)
+
+    print(f"rows per response: {rows_count}")
+    print(f"{'path':>8} {'req/s':>9} {'ms/req':>8}")
+    print(f"{'default':>8} {default_rps:>9.0f} {1000 / default_rps:>8.2f}")
+    print(f"{'fast':>8} {fast_rps:>9.0f} {1000 / fast_rps:>8.2f}")
+    print(f"speedup: {fast_rps / default_rps:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,604 @@
+"""
+In-process stand-ins for Supabase, OpenAI and vecs, used by the load test.
+
+Each fake takes a Latency that is slept on every call. The blocking vecs
+client sleeps with time.sleep, like the real one blocks on I/O; the async
+Supabase and OpenAI clients sleep with asyncio.sleep. The raw SQL that
+SupabaseVectorDB sends to pgvector through its own engine is answered by
+FakeEngine from the same collections.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from utils.vector_index import LocalVectorIndex
+
+EMBEDDING_DIMENSION = 1536
+
+
+class Latency:
+    def __init__(self, seconds: float = 0.0, jitter: float = 0.0):
+        """
+        :param seconds: Mean latency per call
+        :param jitter: Relative spread; each call takes seconds * (1 +/- jitter)
+        """
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def sample(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return max(0.0, self.seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def sleep(self):
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+    async def asleep(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=50000)
+def _token_vector(token: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(token.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    """Deterministic bag-of-words embedding, so texts sharing words land close together."""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        vector += _token_vector(token, dimension)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+# --- Supabase ---------------------------------------------------------------
+
+class FakeResponse:
+    def __init__(self, data: List[dict]):
+        self.data = data
+
+
+def _split_columns(columns: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class _Query:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._rows: List[dict] = []
+        self._values: dict = {}
+        self._filters = []
+        self._order = []
+        self._range = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+
+    def select(self, columns: str = "*", **kwargs):
+        self._op, self._columns = "select", columns
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._op, self._rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self._op, self._rows = "upsert", rows if isinstance(rows, list) else [rows]
+        self._on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] or ["id"]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: dict):
+        self._op, self._values = "update", values
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self._filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def gt(self, column: str, value):
+        self._filters.append(lambda row: str(row.get(column)) > str(value))
+        return self
+
+    def in_(self, column: str, values: Iterable):
+        allowed = {str(v) for v in values}
+        self._filters.append(lambda row: str(row.get(column)) in allowed)
+        return self
+
+    def match(self, query: dict):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self._range = (start, end)
+        return self
+
+    def limit(self, size: int):
+        self._range = (0, size - 1)
+        return self
+
+    async def execute(self) -> FakeResponse:
+        await self._db.latency.asleep()
+        with self._db.lock:
+            return FakeResponse(getattr(self, f"_execute_{self._op}")())
+
+    def _matching(self) -> List[dict]:
+        return [row for row in self._db.tables.setdefault(self._table, []) if all(f(row) for f in self._filters)]
+
+    def _execute_select(self) -> List[dict]:
+        rows = self._matching()
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: str(row.get(column)), reverse=desc)
+        if self._range is not None:
+            rows = rows[self._range[0]:self._range[1] + 1]
+        return [self._project(row, self._columns) for row in rows]
+
+    def _project(self, row: dict, columns: str) -> dict:
+        result = {}
+        for column in _split_columns(columns):
+            if column == "*":
+                result.update(row)
+            elif "(" in column:
+                # Embedded resource, e.g. channels(name) joined through channel_id
+                name, inner = column[:-1].split("(", 1)
+                related_id = row.get(f"{name.rstrip('s')}_id")
+                related = self._db.by_id(name, related_id)
+                result[name] = self._project(related, inner) if related is not None else None
+            else:
+                result[column] = row.get(column)
+        return result
+
+    def _execute_insert(self) -> List[dict]:
+        table = self._db.tables.setdefault(self._table, [])
+        inserted = [self._db.new_row(row) for row in self._rows]
+        table.extend(inserted)
+        return [dict(row) for row in inserted]
+
+    def _execute_upsert(self) -> List[dict]:
+        table = self._db.tables.setdefault(self._table, [])
+        existing = {tuple(str(row.get(c)) for c in self._on_conflict): row for row in table}
+        written = []
+        for row in self._rows:
+            key = tuple(str(row.get(c)) for c in self._on_conflict)
+            current = existing.get(key)
+            if current is None:
+                current = self._db.new_row(row)
+                table.append(current)
+                existing[key] = current
+            elif self._ignore_duplicates:
+                continue
+            else:
+                current.update(row)
+            written.append(dict(current))
+        return written
+
+    def _execute_update(self) -> List[dict]:
+        rows = self._matching()
+        for row in rows:
+            row.update(self._values)
+        return [dict(row) for row in rows]
+
+    def _execute_delete(self) -> List[dict]:
+        rows = self._matching()
+        removed = {id(row) for row in rows}
+        self._db.tables[self._table] = [row for row in self._db.tables[self._table] if id(row) not in removed]
+        return [dict(row) for row in rows]
+
+
+class _RPC:
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    async def execute(self) -> FakeResponse:
+        await self._db.rpc_latency.asleep()
+        with self._db.lock:
+            if self._name == "get_allowed_videos_for_user":
+                rows = self._db.allowed_videos(self._params["user_uuid"])
+                offset = self._params.get("p_offset") or 0
+                return FakeResponse(rows[offset:offset + self._params["p_limit"]])
+            if self._name == "get_allowed_videos_for_user_after":
+                rows = self._db.allowed_videos(self._params["user_uuid"])
+                after = self._params.get("p_after_created_at")
+                if after is not None:
+                    key = (str(after), str(self._params["p_after_id"]))
+                    rows = [row for row in rows if (str(row["created_at"]), str(row["video_id"])) < key]
+                return FakeResponse(rows[:self._params["p_limit"]])
+            if self._name == "refresh_keyword_match_counts":
+                return FakeResponse(self._db.refresh_match_counts(self._params["keyword_ids"]))
+        raise ValueError(f"Unknown RPC: {self._name}")
+
+
+class _Bucket:
+    def __init__(self, db: "FakeSupabase", bucket: str):
+        self._db = db
+        self._bucket = bucket
+
+    async def upload(self, file: bytes, path: str, file_options: Optional[dict] = None):
+        await self._db.storage_latency.asleep()
+        with self._db.lock:
+            self._db.objects[f"{self._bucket}/{path}"] = len(file)
+        return SimpleNamespace(path=path)
+
+    async def get_public_url(self, path: str) -> str:
+        return f"https://fake.supabase.local/storage/v1/object/public/{self._bucket}/{path}"
+
+
+class FakeSupabase:
+    def __init__(self,
+                 tables: Optional[Dict[str, List[dict]]] = None,
+                 latency: Optional[Latency] = None,
+                 rpc_latency: Optional[Latency] = None,
+                 storage_latency: Optional[Latency] = None):
+        """
+        A supabase-py AsyncClient stand-in over in-memory tables.
+
+        Supports the query builder calls the app makes (select with embedded
+        resources, insert, upsert, update, delete, eq, in_, match, order, range,
+        limit), the feed RPCs and storage uploads.
+
+        :param tables: Table name -> rows
+        :param latency: Latency of each table request
+        :param rpc_latency: Latency of each RPC call
+        :param storage_latency: Latency of each storage upload
+        """
+        self.tables = tables or {}
+        self.latency = latency or Latency()
+        self.rpc_latency = rpc_latency or self.latency
+        self.storage_latency = storage_latency or self.latency
+        self.objects: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self.storage = SimpleNamespace(from_=lambda bucket: _Bucket(self, bucket))
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict) -> _RPC:
+        return _RPC(self, name, params)
+
+    def by_id(self, table: str, row_id) -> Optional[dict]:
+        for row in self.tables.get(table, []):
+            if str(row.get("id")) == str(row_id):
+                return row
+        return None
+
+    def new_row(self, row: dict) -> dict:
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    def refresh_match_counts(self, keyword_ids) -> List[dict]:
+        """Recount video_keywords links, as refresh_keyword_match_counts does."""
+        keyword_ids = {str(k) for k in keyword_ids}
+        counts = {}
+        for link in self.tables.get("video_keywords", []):
+            counts[str(link["keyword_id"])] = counts.get(str(link["keyword_id"]), 0) + 1
+        rows = []
+        for keyword in self.tables.get("keywords", []):
+            if str(keyword["id"]) in keyword_ids and keyword.get("matched_at") is not None:
+                keyword["match_count"] = counts.get(str(keyword["id"]), 0)
+                rows.append({"id": keyword["id"], "word": keyword["word"], "match_count": keyword["match_count"]})
+        return rows
+
+    def allowed_videos(self, user_id) -> List[dict]:
+        """Feed rows for a user, as returned by get_allowed_videos_for_user."""
+        user_id = str(user_id)
+        blocked_channels = {str(r["channel_id"]) for r in self.tables.get("user_blocked_channels", []) if str(r["user_id"]) == user_id}
+        blocked_keywords = {str(r["keyword_id"]) for r in self.tables.get("user_blocked_keywords", []) if str(r["user_id"]) == user_id}
+        blocked_videos = {str(r["video_id"]) for r in self.tables.get("video_keywords", []) if str(r["keyword_id"]) in blocked_keywords}
+        channel_names = {str(c["id"]): c["name"] for c in self.tables.get("channels", [])}
+        rows = [
+            {
+                "video_id": video["id"],
+                "external_id": video["external_id"],
+                "title": video["title"],
+                "description": video["description"],
+                "channel_name": channel_names.get(str(video["channel_id"])),
+                "thumbnail_url": video["thumbnail_url"],
+                "channel_id": video["channel_id"],
+                "created_at": video["created_at"]
+            }
+            for video in self.tables.get("videos", [])
+            if str(video["channel_id"]) not in blocked_channels and str(video["id"]) not in blocked_videos
+        ]
+        rows.sort(key=lambda row: (str(row["created_at"]), str(row["video_id"])), reverse=True)
+        return rows
+
+
+# --- OpenAI -----------------------------------------------------------------
+
+class _FakeStream:
+    def __init__(self, chunks: List[str], latency: Latency):
+        self._chunks = chunks
+        self._delay = latency.sample() / max(len(chunks), 1)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(self._delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+    async def close(self):
+        pass
+
+
+class FakeOpenAI:
+    def __init__(self,
+                 embedding_latency: Optional[Latency] = None,
+                 chat_latency: Optional[Latency] = None,
+                 tts_latency: Optional[Latency] = None,
+                 story_words: int = 300):
+        """
+        An AsyncOpenAI stand-in for embeddings, chat completions and speech.
+
+        :param embedding_latency: Latency of each embeddings call
+        :param chat_latency: Latency of a whole completion (spread over chunks when streaming)
+        :param tts_latency: Latency of each speech call
+        :param story_words: Length of generated stories in words
+        """
+        self.embedding_latency = embedding_latency or Latency()
+        self.chat_latency = chat_latency or Latency()
+        self.tts_latency = tts_latency or Latency()
+        self.story_words = story_words
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.audio = SimpleNamespace(speech=SimpleNamespace(create=self._speech))
+
+    async def _embed(self, input, model: str, **kwargs):
+        await self.embedding_latency.asleep()
+        texts = [input] if isinstance(input, str) else input
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=fake_embedding(text))
+            for i, text in enumerate(texts)
+        ])
+
+    async def _chat(self, model: str, messages: List[dict], max_tokens: Optional[int] = None, stream: bool = False, **kwargs):
+        words = ["Once", "upon", "a", "time"] * (self.story_words // 4)
+        # A distinct title per completion, so each story (and its audio) is a new variant
+        text = f"The Great Adventure #{random.getrandbits(32):08x}\n" + " ".join(words)
+        if stream:
+            return _FakeStream([text[i:i + 16] for i in range(0, len(text), 16)], self.chat_latency)
+        await self.chat_latency.asleep()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    async def _speech(self, model: str, voice: str, input: str, **kwargs):
+        await self.tts_latency.asleep()
+        # Roughly the size of a 64 kbps MP3 of the text
+        return SimpleNamespace(content=bytes(len(input) * 40))
+
+    async def close(self):
+        pass
+
+
+# --- vecs -------------------------------------------------------------------
+
+class FakeVecsCollection:
+    def __init__(self, name: str, dimension: int = EMBEDDING_DIMENSION, latency: Optional[Latency] = None):
+        """A vecs Collection stand-in backed by an exact LocalVectorIndex. Metadata filters are ignored."""
+        self.name = name
+        self.dimension = dimension
+        self.latency = latency or Latency()
+        self.index = LocalVectorIndex(dimension, mode="exact")
+
+    def upsert(self, records: Iterable[tuple]):
+        self.latency.sleep()
+        self.index.upsert(records)
+
+    def query(self, data, limit: int = 10, filters: Optional[dict] = None, measure: str = "cosine_distance",
+              include_value: bool = False, include_metadata: bool = False, **kwargs):
+        self.latency.sleep()
+        return self.index.query(data, limit=limit, measure=measure,
+                                include_value=include_value, include_metadata=include_metadata)
+
+    def delete(self, ids: Optional[List[str]] = None, filters: Optional[dict] = None) -> List[str]:
+        self.latency.sleep()
+        ids = list(ids or [])
+        self.index.delete(ids)
+        return ids
+
+    def create_index(self, **kwargs):
+        pass
+
+
+_SQL_TABLE = re.compile(r'vecs\."([^"]+)"')
+_SQL_OPERATOR = re.compile(r"t\.vec (<=>|<->|<#>) cast")
+_SQL_MEASURES = {"<=>": "cosine_distance", "<->": "l2_distance", "<#>": "max_inner_product"}
+
+
+class _FakeResult:
+    def __init__(self, rows: List[tuple]):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchall(self) -> List[tuple]:
+        return list(self.rows)
+
+    def partitions(self, size: int):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start:start + size]
+
+
+class FakeSession:
+    def __init__(self, collections: Dict[str, FakeVecsCollection]):
+        """
+        A SQLAlchemy Session stand-in for the statements SupabaseVectorDB writes
+        against pgvector: range searches, single and batched, and batched k-NN.
+
+        Statements are recognized by their table, distance operator and bind
+        parameters. set local settings are accepted and ignored.
+        """
+        self.collections = collections
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute(self, statement, params: Optional[dict] = None, execution_options: Optional[dict] = None) -> _FakeResult:
+        sql = " ".join(str(statement).split())
+        if sql.startswith("set local"):
+            return _FakeResult([])
+        if sql == "select 1":
+            return _FakeResult([(1,)])
+        table, operator = _SQL_TABLE.search(sql), _SQL_OPERATOR.search(sql)
+        if table is None or operator is None:
+            raise NotImplementedError(f"FakeSession does not support: {sql}")
+        collection = self.collections[table.group(1)]
+        measure = _SQL_MEASURES[operator.group(1)]
+        params = params or {}
+        collection.latency.sleep()
+
+        if "vecs" not in params:
+            return _FakeResult(collection.index.query_radius(
+                json.loads(params["vec"]), params["radius"], measure=measure, max_results=params["max_results"]
+            ))
+        queries = [json.loads(vector) for vector in params["vecs"]]
+        if "radius" in params:
+            batch = collection.index.query_radius_batch(
+                queries, params["radius"], measure=measure, max_results=params["max_results"]
+            )
+        else:
+            batch = collection.index.query_batch(queries, limit=params["limit"], measure=measure)
+        return _FakeResult([
+            (ord_, id_, distance)
+            for ord_, matches in enumerate(batch, start=1)
+            for id_, distance in matches
+        ])
+
+
+class FakeEngine:
+    def __init__(self, collections: Dict[str, FakeVecsCollection]):
+        """A SQLAlchemy Engine stand-in whose sessions query the fake collections."""
+        self.collections = collections
+        self.pool = SimpleNamespace(status=lambda: "fake pool")
+
+    def session(self) -> FakeSession:
+        return FakeSession(self.collections)
+
+    def dispose(self):
+        pass
+
+
+class FakeVecsClient:
+    def __init__(self, collections: Dict[str, FakeVecsCollection]):
+        # SupabaseVectorDB replaces the engine with its own pooled one (see fake_engine_factories)
+        self.engine = FakeEngine(collections)
+        self.Session = self.engine.session
+        self.collections = collections
+
+    def get_or_create_collection(self, name: str, dimension: int) -> FakeVecsCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeVecsCollection(name, dimension)
+        return self.collections[name]
+
+    def disconnect(self):
+        self.engine.dispose()
+
+
+def fake_vecs_module(collections: Dict[str, FakeVecsCollection]) -> SimpleNamespace:
+    """A replacement for the vecs module whose create_client returns a FakeVecsClient."""
+    return SimpleNamespace(create_client=lambda connection_string: FakeVecsClient(collections))
+
+
+def fake_engine_factories(collections: Dict[str, FakeVecsCollection]) -> SimpleNamespace:
+    """Replacements for the create_engine and sessionmaker that SupabaseVectorDB builds its pool with."""
+    return SimpleNamespace(
+        create_engine=lambda url, **kwargs: FakeEngine(collections),
+        sessionmaker=lambda engine: engine.session
+    )
+
+
+# --- Seed data --------------------------------------------------------------
+
+TOPICS = ["dinosaurs", "space", "ocean", "trains", "music", "animals", "colors", "numbers",
+          "friendship", "weather", "farm", "cooking", "pirates", "robots", "dragons", "sports"]
+
+
+def seed_tables(n_channels: int = 20, n_videos: int = 2000, seed: int = 0) -> Dict[str, List[dict]]:
+    """Channels and videos with topic words in their titles, newest first in created_at."""
+    rng = random.Random(seed)
+    channels = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"Channel {i}",
+            "description": f"Videos about {rng.choice(TOPICS)}",
+            "external_id": f"UC{i:06d}"
+        }
+        for i in range(n_channels)
+    ]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    videos = []
+    for i in range(n_videos):
+        topic, other = rng.sample(TOPICS, 2)
+        videos.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "channel_id": rng.choice(channels)["id"],
+            "external_id": f"yt{i:08d}",
+            "title": f"Learning about {topic} and {other} {i}",
+            "description": f"A fun video about {topic} for pre-schoolers.",
+            "thumbnail_url": f"https://i.ytimg.com/vi/yt{i:08d}/hqdefault.jpg",
+            "created_at": (start + timedelta(minutes=i)).isoformat()
+        })
+    return {
+        "channels": channels,
+        "videos": videos,
+        "keywords": [],
+        "video_keywords": [],
+        "user_blocked_keywords": [],
+        "user_blocked_channels": [],
+        "generated_stories": []
+    }
+
+
+def video_records(videos: List[dict]) -> List[tuple]:
+    """(id, embedding, metadata) records for the video collection."""
+    return [
+        (video["id"], fake_embedding(f"{video['title']} {video['description']}"), {"title": video["title"]})
+        for video in videos
+    ]
@@ -10,4 +10,42 @@ RATE_LIMIT_MAX_REQUESTS = os.getenv("RATE_LIMIT_MAX_REQUESTS")
 TEST_USER_ID = os.getenv("TEST_USER_ID")
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
\ No newline at end of file
+KEYWORD_COLLECTION_NAME = os.getenv("KEYWORD_COLLECTION_NAME", "keywords")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+VECTOR_DB_POOL_SIZE = os.getenv("VECTOR_DB_POOL_SIZE", "5")
+VECTOR_DB_MAX_OVERFLOW = os.getenv("VECTOR_DB_MAX_OVERFLOW", "10")
+VECTOR_DB_POOL_TIMEOUT = os.getenv("VECTOR_DB_POOL_TIMEOUT", "30")
+VECTOR_DB_POOL_RECYCLE = os.getenv("VECTOR_DB_POOL_RECYCLE", "1800")
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")
+OPENAI_MAX_CONNECTIONS = os.getenv("OPENAI_MAX_CONNECTIONS", "20")
+OPENAI_EMBEDDING_CONCURRENCY = os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "8")
+OPENAI_CHAT_CONCURRENCY = os.getenv("OPENAI_CHAT_CONCURRENCY", "4")
+OPENAI_TTS_CONCURRENCY = os.getenv("OPENAI_TTS_CONCURRENCY", "4")
+OPENAI_EMBEDDING_TIMEOUT = os.getenv("OPENAI_EMBEDDING_TIMEOUT", "15")
+OPENAI_CHAT_TIMEOUT = os.getenv("OPENAI_CHAT_TIMEOUT", "120")
+OPENAI_TTS_TIMEOUT = os.getenv("OPENAI_TTS_TIMEOUT", "60")
+VECTOR_LOCAL_INDEX = os.getenv("VECTOR_LOCAL_INDEX", "")
+VECTOR_LOCAL_INDEX_PROBES = os.getenv("VECTOR_LOCAL_INDEX_PROBES", "8")
+VECTOR_LOCAL_INDEX_REFRESH = os.getenv("VECTOR_LOCAL_INDEX_REFRESH", "60")
+STORY_JOB_WORKERS = os.getenv("STORY_JOB_WORKERS", "2")
+STORY_JOB_QUEUE_SIZE = os.getenv("STORY_JOB_QUEUE_SIZE", "100")
+STORY_JOB_RESULT_TTL = os.getenv("STORY_JOB_RESULT_TTL", "3600")
+STORY_JOB_POLL_MAX_REQUESTS = os.getenv("STORY_JOB_POLL_MAX_REQUESTS", "120")
+FEED_CACHE_TTL = os.getenv("FEED_CACHE_TTL", "60")
+FEED_CACHE_MAX_ENTRIES = os.getenv("FEED_CACHE_MAX_ENTRIES", "10000")
+FEED_CACHE_MAX_ROWS = os.getenv("FEED_CACHE_MAX_ROWS", "500000")
+FEED_MATERIALIZED = os.getenv("FEED_MATERIALIZED", "false")
+FEED_MATERIALIZED_MAX_USERS = os.getenv("FEED_MATERIALIZED_MAX_USERS", "10000")
+FEED_CATALOG_REFRESH = os.getenv("FEED_CATALOG_REFRESH", "300")
+CHANNEL_CATALOG_TTL = os.getenv("CHANNEL_CATALOG_TTL", "300")
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false")
+SLOW_REQUEST_THRESHOLD_MS = os.getenv("SLOW_REQUEST_THRESHOLD_MS", "")
+SYNC_THREAD_POOL_SIZE = os.getenv("SYNC_THREAD_POOL_SIZE", "16")
+STORY_CACHE = os.getenv("STORY_CACHE", "false")
+STORY_CACHE_REUSE_RATIO = os.getenv("STORY_CACHE_REUSE_RATIO", "0.8")
+KEYWORD_MATCH_MAX_DISTANCE = os.getenv("KEYWORD_MATCH_MAX_DISTANCE", "0.25")
+KEYWORD_MATCH_MAX_RESULTS = os.getenv("KEYWORD_MATCH_MAX_RESULTS", "1000")
+KEYWORD_REGISTRY_MAX_ENTRIES = os.getenv("KEYWORD_REGISTRY_MAX_ENTRIES", "50000")
+KEYWORD_REGISTRY_TTL = os.getenv("KEYWORD_REGISTRY_TTL", "3600")
@@ -1,7 +1,11 @@
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, Field
+from typing import List
 
 class KeywordBase(BaseModel):
     word: str
 
 class Keyword(KeywordBase):
-    id: UUID4
\ No newline at end of file
+    id: UUID4
+
+class BulkKeywordRequest(BaseModel):
+    words: List[str] = Field(..., min_length=1, max_length=100)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class GeneratedStoryBase(BaseModel):
@@ -18,4 +18,12 @@ class GeneratedStory(GeneratedStoryBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class StoryJob(BaseModel):
+    job_id: str
+    status: str
+    stage: str
+    progress: float
+    result: Optional[GeneratedStory] = None
+    error: Optional[str] = None
@@ -36,7 +36,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post("/sign-up", response_model=AuthResponse)
 async def sign_up(request: SignUpRequest = Body(...), supabase=Depends(get_supabase)):
     try:
-        user = supabase.auth.sign_up({
+        user = await supabase.auth.sign_up({
             "email": request.email,
             "password": request.password, 
             "options": {
@@ -60,7 +60,7 @@ async def sign_up(request: SignUpRequest = Body(...), supabase=Depends(get_supab
 @router.post("/sign-in", response_model=AuthResponse)
 async def sign_in(request: SignInRequest, supabase=Depends(get_supabase)):
     try:
-        user = supabase.auth.sign_in_with_password({
+        user = await supabase.auth.sign_in_with_password({
             "email": request.email,
             "password": request.password
         })
@@ -78,7 +78,7 @@ async def sign_in(request: SignInRequest, supabase=Depends(get_supabase)):
 
 @router.post("/sign-out")
 async def sign_out(supabase=Depends(get_supabase), current_user: dict = Depends(get_current_user)):
-    supabase.auth.sign_out()
+    await supabase.auth.sign_out()
     logger.info(f"User signed out successfully: {current_user.id}")
     return {"message": "Signed out successfully"}
 
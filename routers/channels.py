@@ -1,62 +1,109 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from typing import List, Optional
 from pydantic import UUID4
 from models.channels import ChannelResponse
 from config.logger import logger
-from utils.auth import get_supabase, get_current_user
+from utils.auth import get_supabase, get_current_user, get_feed_cache, get_blocked_sets, get_channel_catalog
+from utils.channel_catalog import etag_matches
+from utils.responses import FAST_RESPONSES_ENABLED, FastJSONResponse
 
 router = APIRouter(prefix="/channels", tags=["channels"])
 
 @router.post("/block/{channel_id}", response_model=bool)
-async def block_user_channel(channel_id: UUID4, supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
+async def block_user_channel(
+    channel_id: UUID4,
+    supabase=Depends(get_supabase),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
     try:
-        response = supabase.table('user_blocked_channels').insert({
-            'user_id': current_user.id,
+        response = await supabase.table('user_blocked_channels').insert({
+            'user_id': current_user['id'],
             'channel_id': str(channel_id)
         }).execute()
         
         if response.data:
-            logger.info(f"Channel {channel_id} blocked for user {current_user.id}")
+            feed_cache.invalidate_tag(str(current_user['id']))
+            if blocked_sets is not None:
+                blocked_sets.block_channel(str(current_user['id']), str(channel_id))
+            logger.info(f"Channel {channel_id} blocked for user {current_user['id']}")
             return True
         else:
-            logger.error(f"Failed to block channel {channel_id} for user {current_user.id}")
+            logger.error(f"Failed to block channel {channel_id} for user {current_user['id']}")
             return False
     except Exception as e:
-        logger.error(f"Error blocking channel {channel_id} for user {current_user.id}: {str(e)}")
+        logger.error(f"Error blocking channel {channel_id} for user {current_user['id']}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/unblock/{channel_id}", response_model=bool)
-async def unblock_user_channel(channel_id: UUID4, supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
+async def unblock_user_channel(
+    channel_id: UUID4,
+    supabase=Depends(get_supabase),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
     try:
-        response = supabase.table('user_blocked_channels').delete().match({
-            'user_id': current_user.id,
+        response = await supabase.table('user_blocked_channels').delete().match({
+            'user_id': current_user['id'],
             'channel_id': str(channel_id)
         }).execute()
         
         if response.data:
-            logger.info(f"Channel {channel_id} unblocked for user {current_user.id}")
+            feed_cache.invalidate_tag(str(current_user['id']))
+            if blocked_sets is not None:
+                blocked_sets.unblock_channel(str(current_user['id']), str(channel_id))
+            logger.info(f"Channel {channel_id} unblocked for user {current_user['id']}")
             return True
         else:
-            logger.info(f"Channel {channel_id} not found in blocked list for user {current_user.id}")
+            logger.info(f"Channel {channel_id} not found in blocked list for user {current_user['id']}")
             return False
     except Exception as e:
-        logger.error(f"Error unblocking channel {channel_id} for user {current_user.id}: {str(e)}")
+        logger.error(f"Error unblocking channel {channel_id} for user {current_user['id']}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/", response_model=List[ChannelResponse])
-async def get_user_channels(supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
+async def get_user_channels(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    supabase=Depends(get_supabase),
+    channel_catalog=Depends(get_channel_catalog),
+    current_user=Depends(get_current_user)
+):
     try:
-        # Fetch all channels
-        channels_response = supabase.table('channels').select('id, name, description, external_id').execute()
+        # All channels come from the in-process catalog; only the small blocked set hits the database
+        channels = await channel_catalog.get()
         
         # Fetch blocked channels for the user
-        blocked_channels_response = supabase.table('user_blocked_channels').select('channel_id').eq('user_id', current_user.id).execute()
+        blocked_channels_response = await supabase.table('user_blocked_channels').select('channel_id').eq('user_id', current_user['id']).execute()
+        blocked_channel_ids = {item['channel_id'] for item in blocked_channels_response.data}
+
+        etag = channel_catalog.etag(blocked_channel_ids)
+        if etag_matches(if_none_match, etag):
+            logger.info(f"Channels unchanged for user {current_user['id']}")
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
         
-        if channels_response.data:
-            blocked_channel_ids = {item['channel_id'] for item in blocked_channels_response.data}
-            
+        if FAST_RESPONSES_ENABLED:
+            # Catalog rows are trusted; build the payload as plain dicts
+            user_channels = [
+                {
+                    'id': channel['id'],
+                    'name': channel['name'],
+                    'description': channel['description'],
+                    'external_id': channel['external_id'],
+                    'is_blocked': channel['id'] in blocked_channel_ids
+                }
+                for channel in channels
+            ]
+            logger.info(f"Fetched {len(user_channels)} channels for user {current_user['id']}")
+            return FastJSONResponse(user_channels, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+        if channels:
             user_channels = [
                 ChannelResponse(
                     id=channel['id'],
@@ -65,14 +112,14 @@ async def get_user_channels(supabase=Depends(get_supabase), current_user=Depends
                     external_id=channel['external_id'],
                     is_blocked=channel['id'] in blocked_channel_ids
                 )
-                for channel in channels_response.data
+                for channel in channels
             ]
             
-            logger.info(f"Fetched {len(user_channels)} channels for user {current_user.id}")
+            logger.info(f"Fetched {len(user_channels)} channels for user {current_user['id']}")
             return user_channels
         else:
             logger.info(f"No channels found")
             return []
     except Exception as e:
-        logger.error(f"Error fetching channels for user {current_user.id}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        logger.error(f"Error fetching channels for user {current_user['id']}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,18 +1,29 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from models.keywords import KeywordBase, Keyword
+from models.keywords import KeywordBase, Keyword, BulkKeywordRequest
 from config.logger import logger
-from utils.auth import get_supabase, get_current_user
-from services.keyword_service import process_keyword
+from utils.auth import get_supabase, get_current_user, get_supabase_vector_db, get_keyword_db, get_keyword_registry, get_ai_client, get_feed_cache, get_blocked_sets
+from services.keyword_service import process_keyword, process_keywords_bulk
 
 router = APIRouter(prefix="/keywords", tags=["keywords"])
 
 @router.post("/", response_model=dict)
-async def add_keyword(keyword: KeywordBase, supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
+async def add_keyword(
+    keyword: KeywordBase,
+    supabase=Depends(get_supabase),
+    vector_db=Depends(get_supabase_vector_db),
+    keyword_db=Depends(get_keyword_db),
+    keyword_registry=Depends(get_keyword_registry),
+    ai_client=Depends(get_ai_client),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
     try:
-        result = await process_keyword(keyword, current_user['id'], supabase)
+        result = await process_keyword(keyword, current_user['id'], supabase, vector_db, ai_client, blocked_sets, keyword_db, keyword_registry)
         
         if result["success"]:
+            feed_cache.invalidate_tag(str(current_user['id']))
             return {
                 "status": "success",
                 "message": result["message"],
@@ -28,10 +39,37 @@ async def add_keyword(keyword: KeywordBase, supabase=Depends(get_supabase), curr
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/bulk", response_model=dict)
+async def add_keywords_bulk(
+    request: BulkKeywordRequest,
+    supabase=Depends(get_supabase),
+    vector_db=Depends(get_supabase_vector_db),
+    keyword_db=Depends(get_keyword_db),
+    keyword_registry=Depends(get_keyword_registry),
+    ai_client=Depends(get_ai_client),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
+    try:
+        results = await process_keywords_bulk(request.words, current_user['id'], supabase, vector_db, ai_client, blocked_sets, keyword_db, keyword_registry)
+        feed_cache.invalidate_tag(str(current_user['id']))
+        return {
+            "status": "success",
+            "message": f"Processed {len(results)} keywords",
+            "data": {
+                "results": results
+            }
+        }
+    except Exception as e:
+        logger.error(f"Error processing bulk keywords for user {current_user['id']}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.get("/", response_model=List[Keyword])
 async def get_keywords(supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
     try:
-        response = supabase.table('user_blocked_keywords').select(
+        response = await supabase.table('user_blocked_keywords').select(
             '*,keywords(*)'
         ).eq('user_id', current_user['id']).execute()
         
@@ -58,11 +96,20 @@ async def get_keywords(supabase=Depends(get_supabase), current_user=Depends(get_
 
 
 @router.delete("/{keyword_id}", response_model=dict)
-async def delete_keyword(keyword_id: str, supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
+async def delete_keyword(
+    keyword_id: str,
+    supabase=Depends(get_supabase),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
     try:
-        response = supabase.table('user_blocked_keywords').delete().eq('keyword_id', keyword_id).eq('user_id', current_user['id']).execute()
+        response = await supabase.table('user_blocked_keywords').delete().eq('keyword_id', keyword_id).eq('user_id', current_user['id']).execute()
         
         if response.data:
+            feed_cache.invalidate_tag(str(current_user['id']))
+            if blocked_sets is not None:
+                blocked_sets.unblock_keyword(str(current_user['id']), keyword_id)
             logger.info(f"Keyword {keyword_id} deleted for user {current_user['id']}")
             return {"status": "success", "message": f"Keyword {keyword_id} deleted successfully"}
         else:
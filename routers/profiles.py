@@ -8,7 +8,7 @@ router = APIRouter(prefix="/profiles", tags=["profiles"])
 @router.post("/", response_model=Profile)
 async def add_profile(profile: ProfileBase, supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
     try:
-        response = supabase.table('profiles').insert({
+        response = await supabase.table('profiles').insert({
             'id': str(current_user.id),
             'full_name': profile.full_name,
             'date_of_birth': profile.date_of_birth
@@ -29,7 +29,7 @@ async def add_profile(profile: ProfileBase, supabase=Depends(get_supabase), curr
 @router.get("/", response_model=Profile)
 async def get_profile(supabase=Depends(get_supabase), current_user=Depends(get_current_user)):
     try:
-        response = supabase.table('profiles').select('*').eq('id', str(current_user.id)).execute()
+        response = await supabase.table('profiles').select('*').eq('id', str(current_user.id)).execute()
         
         if response.data:
             profile = Profile(**response.data[0])
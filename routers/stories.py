@@ -1,21 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from models.stories import GeneratedStoryCreate, GeneratedStory
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Union
+from models.stories import GeneratedStoryCreate, GeneratedStory, StoryJob
 from services.story_service import StoryService
-from utils.auth import get_current_user, get_supabase
+from utils.auth import get_current_user, get_supabase, get_ai_client, get_job_queue
+from utils.jobs import QueueFullError
+from utils.responses import FAST_RESPONSES_ENABLED, FastJSONResponse
 from config.logger import logger
 
 router = APIRouter(prefix="/stories", tags=["stories"])
 
-async def get_story_service(supabase = Depends(get_supabase)):
-    return StoryService(supabase)
+async def get_story_service(supabase = Depends(get_supabase), ai_client = Depends(get_ai_client)):
+    return StoryService(supabase, ai_client)
 
-@router.post("/create", response_model=GeneratedStory)
+@router.post("/create", response_model=Union[GeneratedStory, StoryJob])
 async def create_story(
     story: GeneratedStoryCreate, 
+    response: Response,
+    background: bool = Query(False),
     story_service: StoryService = Depends(get_story_service),
+    job_queue = Depends(get_job_queue),
     current_user: dict = Depends(get_current_user)
 ):
+    if background:
+        try:
+            job = job_queue.submit("story", {"story": story, "user_id": current_user['id']}, owner=current_user['id'])
+        except QueueFullError:
+            logger.warning(f"Story job queue full, rejecting request for user {current_user['id']}")
+            raise HTTPException(status_code=503, detail="Story queue is full, try again later", headers={"Retry-After": "30"})
+        logger.info(f"Queued story job {job.id} for user {current_user['id']}")
+        response.status_code = 202
+        return StoryJob(**job.to_dict())
+
     try:
         logger.info(f"Attempting to create story for user {current_user['id']}")
         created_story = await story_service.create_story(story, current_user['id'])
@@ -26,6 +43,35 @@ async def create_story(
         logger.error(f"Error creating story: {str(e)}")
         raise HTTPException(status_code=500, detail="An error occurred while creating the story")
 
+@router.post("/create/stream")
+async def create_story_stream(
+    story: GeneratedStoryCreate,
+    story_service: StoryService = Depends(get_story_service),
+    current_user: dict = Depends(get_current_user)
+):
+    logger.info(f"Attempting to stream story for user {current_user['id']}")
+
+    async def event_stream():
+        async for event, data in story_service.stream_story(story, current_user['id']):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}", response_model=StoryJob)
+async def get_story_job(
+    job_id: str,
+    job_queue = Depends(get_job_queue),
+    current_user: dict = Depends(get_current_user)
+):
+    job = job_queue.get(job_id)
+    if job is None or job.owner != current_user['id']:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StoryJob(**job.to_dict())
+
 @router.get("/", response_model=List[GeneratedStory])
 async def get_stories(
     story_service: StoryService = Depends(get_story_service),
@@ -33,6 +79,10 @@ async def get_stories(
 ):
     try:
         logger.info(f"Fetching stories for user {current_user['id']}")
+        if FAST_RESPONSES_ENABLED:
+            rows = await story_service.get_story_rows(current_user['id'])
+            logger.info(f"Successfully fetched {len(rows)} stories")
+            return FastJSONResponse(rows)
         stories = await story_service.get_stories(current_user['id'])
         logger.info(f"Successfully fetched {len(stories)} stories")
         return stories
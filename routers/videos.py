@@ -1,39 +1,100 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
 from models.videos import AllowedVideo
 from config.logger import logger
-from utils.auth import get_supabase, get_current_user
+from utils.auth import get_supabase, get_current_user, get_feed_cache, get_blocked_sets
+from utils.pagination import encode_cursor, decode_cursor
+from services.feed_service import ensure_user_loaded
+from utils.responses import FAST_RESPONSES_ENABLED, FastJSONResponse, project_rows
+from utils.metrics import span
 
 router = APIRouter(prefix="/videos", tags=["videos"])
 
-@router.get("/feed", response_model=List[AllowedVideo])
-async def get_allowed_videos(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=1, le=100),
-    supabase=Depends(get_supabase),
-    current_user=Depends(get_current_user)
-):
-    try:
+async def _fetch_feed_rows(supabase, blocked_sets, user_id: str, page: int, page_size: int, cursor: Optional[str], after):
+    if blocked_sets is not None:
+        # Materialized mode: catalog order minus the user's blocked-video bitmap
+        await ensure_user_loaded(blocked_sets, supabase, user_id)
+        if cursor is not None:
+            start = blocked_sets.catalog.seek(*after) if after else 0
+            rows = blocked_sets.page(user_id, page_size, start=start)
+        else:
+            rows = blocked_sets.page(user_id, page_size, offset=(page - 1) * page_size)
+        return rows or []
+
+    if cursor is not None:
+        # Keyset pagination: seek past the last row seen instead of skipping rows
+        rpc_name = 'get_allowed_videos_for_user_after'
+        rpc_params = {
+            'user_uuid': user_id,
+            'p_limit': page_size,
+            'p_after_created_at': after[0] if after else None,
+            'p_after_id': after[1] if after else None
+        }
+    else:
         # Calculate offset
         offset = (page - 1) * page_size
 
         # Prepare RPC parameters
+        rpc_name = 'get_allowed_videos_for_user'
         rpc_params = {
-            'user_uuid': str(current_user['id']),
+            'user_uuid': user_id,
             'p_limit': page_size,
             'p_offset': offset
         }
 
-        # Call the RPC function
-        response = supabase.rpc('get_allowed_videos_for_user', rpc_params).execute()
-        
-        if response.data:
-            allowed_videos = [AllowedVideo(**video) for video in response.data]
-            logger.info(f"Fetched {len(allowed_videos)} allowed videos for user {current_user['id']} (page {page})")
-            return allowed_videos
+    # Call the RPC function
+    with span(f"supabase.rpc.{rpc_name}"):
+        response = await supabase.rpc(rpc_name, rpc_params).execute()
+    return response.data or []
+
+
+@router.get("/feed", response_model=List[AllowedVideo])
+async def get_allowed_videos(
+    response: Response,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor; pass an empty value to start. Overrides page."),
+    supabase=Depends(get_supabase),
+    feed_cache=Depends(get_feed_cache),
+    blocked_sets=Depends(get_blocked_sets),
+    current_user=Depends(get_current_user)
+):
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    position = f"cursor {cursor or 'start'}" if cursor is not None else f"page {page}"
+    try:
+        # Serve repeat scrolls from the per-user cache; block changes invalidate it
+        cache_key = ('feed', str(current_user['id']), position, page_size)
+        cached = feed_cache.get(cache_key)
+        if cached is not None:
+            allowed_videos, next_cursor = cached
+            logger.info(f"Served {len(allowed_videos)} cached videos for user {current_user['id']} ({position})")
         else:
-            logger.info(f"No allowed videos found for user {current_user['id']} (page {page})")
-            return []
+            rows = await _fetch_feed_rows(supabase, blocked_sets, str(current_user['id']), page, page_size, cursor, after)
+            if FAST_RESPONSES_ENABLED:
+                # RPC output already has the AllowedVideo shape; skip per-row validation
+                allowed_videos = project_rows(rows, AllowedVideo)
+            else:
+                allowed_videos = [AllowedVideo(**video) for video in rows]
+            next_cursor = None
+            if cursor is not None and len(rows) == page_size:
+                next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['video_id'])
+
+            if allowed_videos:
+                logger.info(f"Fetched {len(allowed_videos)} allowed videos for user {current_user['id']} ({position})")
+            else:
+                logger.info(f"No allowed videos found for user {current_user['id']} ({position})")
+
+            feed_cache.set(cache_key, (allowed_videos, next_cursor), tags=[str(current_user['id'])], weight=max(len(allowed_videos), 1))
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if FAST_RESPONSES_ENABLED:
+            return FastJSONResponse(allowed_videos, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+        return allowed_videos
     except Exception as e:
         logger.error(f"Error fetching allowed videos for user {current_user['id']}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -41,7 +102,6 @@ async def get_allowed_videos(
 
 
 
-
 '''
 
 # TODO : Remove after testing
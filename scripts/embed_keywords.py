@@ -0,0 +1,63 @@
+"""
+Backfill the keyword collection with embeddings of already stored keywords.
+
+    python -m scripts.embed_keywords
+
+Keywords blocked through the API are embedded into the keyword collection as
+they are added; this covers keywords stored before that. Rerunning it is
+harmless: vectors are upserted by keyword id.
+"""
+import argparse
+import asyncio
+from supabase import acreate_client
+from utils.ai_client import AIClient
+from utils.supabase_vector import SupabaseVectorDB
+from config.settings import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    DB_CONNECTION_STRING,
+    KEYWORD_COLLECTION_NAME,
+    OPENAI_API_KEY
+)
+
+
+async def run(args):
+    supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    db = SupabaseVectorDB(
+        db_connection=DB_CONNECTION_STRING,
+        collection_name=KEYWORD_COLLECTION_NAME,
+        dimension=1536,
+        pool_size=1,
+        max_overflow=0
+    )
+    ai_client = AIClient(api_key=OPENAI_API_KEY)
+    try:
+        stored, after_id = 0, None
+        while True:
+            query = supabase.table('keywords').select('id, word').order('id')
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            rows = (await query.limit(args.batch_size).execute()).data
+            if not rows:
+                break
+            embeddings = await ai_client.embed([row['word'] for row in rows])
+            db.add_vectors([
+                (row['id'], embedding, {'word': row['word']})
+                for row, embedding in zip(rows, embeddings)
+            ])
+            stored += len(rows)
+            after_id = rows[-1]['id']
+        print(f"Embedded {stored} keywords into {KEYWORD_COLLECTION_NAME}")
+    finally:
+        await ai_client.close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Keywords per embeddings call")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
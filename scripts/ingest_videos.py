@@ -0,0 +1,117 @@
+"""
+Embed the video catalog into the vector collection.
+
+    python -m scripts.ingest_videos                       # from the videos table
+    python -m scripts.ingest_videos --jsonl videos.jsonl  # from an export
+
+Titles and descriptions are embedded in batches, and batches are upserted in
+parallel over pooled connections. Progress is checkpointed after every
+batch: rerunning the same command resumes where the last run stopped, and
+--restart starts over.
+
+Each stored batch is also matched against the embeddings of blocked keywords,
+so new videos get their video_keywords links without rerunning keyword
+searches (--no-keyword-links skips this). The keyword collection is held in
+memory and refreshed before each batch is matched, so keywords blocked while
+this runs are matched too.
+"""
+import argparse
+import asyncio
+import os
+from supabase import acreate_client
+from services.ingestion_service import Checkpoint, ingest_videos, iter_jsonl_videos, iter_table_videos
+from services.keyword_service import match_new_videos
+from utils import concurrency
+from utils.concurrency import run_sync
+from utils.ai_client import AIClient
+from utils.supabase_vector import SupabaseVectorDB
+from config.settings import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    DB_CONNECTION_STRING,
+    COLLECTION_NAME,
+    KEYWORD_COLLECTION_NAME,
+    OPENAI_API_KEY,
+    OPENAI_EMBEDDING_TIMEOUT
+)
+
+
+async def run(args):
+    source = f"jsonl:{os.path.abspath(args.jsonl)}" if args.jsonl else f"table:videos->{COLLECTION_NAME}"
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint, source)
+    if checkpoint.position is not None:
+        print(f"Resuming after {checkpoint.position} ({checkpoint.vectors} vectors already stored)")
+
+    concurrency.configure(args.concurrency)
+    db = SupabaseVectorDB(
+        db_connection=DB_CONNECTION_STRING,
+        collection_name=COLLECTION_NAME,
+        dimension=1536,
+        pool_size=args.concurrency,
+        max_overflow=0
+    )
+    # No embedding cache: catalog texts would only evict keyword embeddings
+    ai_client = AIClient(
+        api_key=OPENAI_API_KEY,
+        embedding_concurrency=args.concurrency,
+        embedding_timeout=float(OPENAI_EMBEDDING_TIMEOUT)
+    )
+    keyword_db = None
+    try:
+        supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+        if args.jsonl:
+            videos = iter_jsonl_videos(args.jsonl, after_line=checkpoint.position)
+        else:
+            videos = iter_table_videos(supabase, after_id=checkpoint.position)
+        link_keywords = None
+        if not args.no_keyword_links:
+            keyword_db = SupabaseVectorDB(
+                db_connection=DB_CONNECTION_STRING,
+                collection_name=KEYWORD_COLLECTION_NAME,
+                dimension=1536,
+                pool_size=1,
+                max_overflow=0
+            )
+            keyword_db.enable_local_index(mode="exact")
+
+            async def link_keywords(videos):
+                # process_keyword stores a keyword's embedding before searching the
+                # videos, so a keyword its search ran too early for is already here
+                await run_sync(keyword_db.refresh_local_index)
+                return await match_new_videos(supabase, keyword_db, videos)
+        stats = await ingest_videos(
+            videos,
+            db,
+            ai_client,
+            checkpoint=checkpoint,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            report_every=args.report_every,
+            link_keywords=link_keywords
+        )
+        print(f"Stored {stats['vectors']} vectors and {stats['links']} keyword links in {stats['seconds']:.1f}s "
+              f"({stats['vectors_per_second']:.1f} vectors/s, {stats['skipped']} videos without text skipped)")
+    finally:
+        await ai_client.close()
+        db.close()
+        if keyword_db is not None:
+            keyword_db.close()
+        concurrency.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jsonl", help="Read videos from this JSONL export instead of the videos table")
+    parser.add_argument("--checkpoint", default=".cache/ingest_videos.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--batch-size", type=int, default=256, help="Videos per embeddings call and upsert")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight (and database connections)")
+    parser.add_argument("--no-keyword-links", action="store_true", help="Do not match new videos against blocked keywords")
+    parser.add_argument("--report-every", type=float, default=10, help="Seconds between progress reports")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Dict, List
+from supabase import AsyncClient
+from utils.blocked_sets import BlockedVideoSets, FeedCatalog
+from utils.metrics import span
+from config.logger import logger
+
+
+async def load_feed_catalog(supabase: AsyncClient, batch_size: int = 1000) -> FeedCatalog:
+    """
+    Load every video in feed order (created_at desc, id desc).
+
+    :param supabase: The Supabase client.
+    :param batch_size: Rows fetched per request.
+    :return: The catalog.
+    """
+    rows = []
+    start = 0
+    while True:
+        with span("supabase.videos.select"):
+            response = await supabase.table('videos').select(
+                'id, external_id, title, description, thumbnail_url, created_at, channel_id, channels(name)'
+            ).order('created_at', desc=True).order('id', desc=True).range(start, start + batch_size - 1).execute()
+        for video in response.data:
+            rows.append({
+                'video_id': video['id'],
+                'external_id': video['external_id'],
+                'title': video['title'],
+                'description': video['description'],
+                'channel_name': (video.get('channels') or {}).get('name'),
+                'thumbnail_url': video['thumbnail_url'],
+                'channel_id': video['channel_id'],
+                'created_at': video['created_at']
+            })
+        if len(response.data) < batch_size:
+            break
+        start += batch_size
+
+    logger.info(f"Loaded feed catalog with {len(rows)} videos")
+    return FeedCatalog(rows)
+
+
+async def ensure_user_loaded(blocked_sets: BlockedVideoSets, supabase: AsyncClient, user_id: str):
+    """
+    Materialize a user's blocked videos on first access.
+
+    :param blocked_sets: The BlockedVideoSets instance.
+    :param supabase: The Supabase client.
+    :param user_id: The user.
+    """
+    if blocked_sets.is_loaded(user_id):
+        return
+
+    # Blocks changed while the reads below are awaited are replayed by load_user
+    blocked_sets.begin_load(user_id)
+    try:
+        with span("supabase.user_blocks.select"):
+            channels, keywords = await asyncio.gather(
+                supabase.table('user_blocked_channels').select('channel_id').eq('user_id', user_id).execute(),
+                supabase.table('user_blocked_keywords').select('keyword_id').eq('user_id', user_id).execute()
+            )
+        keyword_ids = [row['keyword_id'] for row in keywords.data]
+
+        keyword_videos: Dict[str, List[str]] = {keyword_id: [] for keyword_id in keyword_ids}
+        if keyword_ids:
+            with span("supabase.video_keywords.select"):
+                links = await supabase.table('video_keywords').select('keyword_id, video_id').in_('keyword_id', keyword_ids).execute()
+            for link in links.data:
+                keyword_videos[link['keyword_id']].append(link['video_id'])
+    except BaseException:
+        blocked_sets.abort_load(user_id)
+        raise
+
+    blocked_sets.load_user(user_id, [row['channel_id'] for row in channels.data], keyword_videos)
+    logger.info(f"Materialized blocked videos for user {user_id} ({len(channels.data)} channels, {len(keyword_ids)} keywords)")
+
+
+async def _new_video_links(supabase: AsyncClient, video_ids: List[str], chunk_size: int = 500) -> Dict[str, List[str]]:
+    """
+    Read the keyword links of videos new to the catalog.
+
+    :param supabase: The Supabase client.
+    :param video_ids: Video ids.
+    :param chunk_size: Video ids per request.
+    :return: A mapping of keyword id to linked video ids.
+    """
+    links: Dict[str, List[str]] = {}
+    for i in range(0, len(video_ids), chunk_size):
+        with span("supabase.video_keywords.select"):
+            response = await supabase.table('video_keywords').select('keyword_id, video_id').in_(
+                'video_id', video_ids[i:i + chunk_size]
+            ).execute()
+        for link in response.data:
+            links.setdefault(link['keyword_id'], []).append(link['video_id'])
+    return links
+
+
+async def refresh_catalog_periodically(blocked_sets: BlockedVideoSets, supabase: AsyncClient, interval: float):
+    """
+    Reload the catalog every interval seconds and rebase the loaded users onto it.
+
+    An unchanged catalog is skipped. Otherwise the keyword links of videos new
+    to the catalog are read once, and every loaded user keeps its blocks (see
+    BlockedVideoSets.rebase), so no feed request has to reload them.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            catalog = await load_feed_catalog(supabase)
+            if catalog.digest == blocked_sets.catalog.digest:
+                continue
+            new_video_ids = [video_id for video_id in catalog.positions if video_id not in blocked_sets.catalog.positions]
+            new_links = await _new_video_links(supabase, new_video_ids) if new_video_ids else {}
+            blocked_sets.rebase(catalog, new_links)
+            logger.info(f"Rebased {blocked_sets.stats()['users']} users onto the feed catalog ({len(new_video_ids)} new videos)")
+        except Exception as e:
+            logger.error(f"Error refreshing feed catalog: {str(e)}")
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from supabase import AsyncClient
+from utils.ai_client import AIClient
+from utils.concurrency import run_sync
+from utils.supabase_vector import SupabaseVectorDB
+from config.logger import logger
+
+# (resume position, video row) pairs, in source order
+VideoStream = AsyncIterator[Tuple[object, dict]]
+# Called with the (video id, embedding) pairs of each stored batch; returns the links written
+KeywordLinker = Callable[[List[Tuple[str, list]]], Awaitable[int]]
+
+
+def video_text(video: dict) -> str:
+    """The text embedded for a video: its title followed by its description."""
+    return "\n".join(part.strip() for part in (video.get('title'), video.get('description')) if part and part.strip())
+
+
+async def iter_table_videos(supabase: AsyncClient, after_id: Optional[str] = None, page_size: int = 1000) -> VideoStream:
+    """
+    Stream rows of the videos table in id order, one page at a time.
+
+    :param supabase: The Supabase client.
+    :param after_id: Resume after this video id.
+    :param page_size: Rows fetched per request.
+    :return: (video id, row) pairs; the id is the resume position.
+    """
+    while True:
+        query = supabase.table('videos').select('id, title, description, channel_id').order('id')
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        response = await query.limit(page_size).execute()
+        for video in response.data:
+            yield video['id'], video
+        if len(response.data) < page_size:
+            return
+        after_id = response.data[-1]['id']
+
+
+async def iter_jsonl_videos(path: str, after_line: Optional[int] = None) -> VideoStream:
+    """
+    Stream video rows from a JSONL export, one object per line.
+
+    :param path: The export file.
+    :param after_line: Resume after this (1-based) line number.
+    :return: (line number, row) pairs; the line number is the resume position.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if after_line is not None and line_number <= after_line:
+                continue
+            if line.strip():
+                yield line_number, json.loads(line)
+            if line_number % 1000 == 0:
+                # Let in-flight batches progress while a large file is read
+                await asyncio.sleep(0)
+
+
+class Checkpoint:
+    def __init__(self, path: str, source: str):
+        """
+        Progress of one ingestion run, written atomically after every batch.
+
+        :param path: Checkpoint file.
+        :param source: Identifies the input; a checkpoint for another source is ignored.
+        """
+        self.path = path
+        self.source = source
+        self.position = None
+        self.vectors = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get('source') == source:
+                self.position = state.get('position')
+                self.vectors = state.get('vectors', 0)
+
+    def save(self, position, vectors: int):
+        self.position = position
+        self.vectors = vectors
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'source': self.source, 'position': position, 'vectors': vectors}, f)
+        os.replace(tmp, self.path)
+
+
+async def ingest_videos(
+    videos: VideoStream,
+    db: SupabaseVectorDB,
+    ai_client: AIClient,
+    checkpoint: Optional[Checkpoint] = None,
+    batch_size: int = 256,
+    concurrency: int = 4,
+    report_every: float = 10,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    link_keywords: Optional[KeywordLinker] = None
+) -> dict:
+    """
+    Embed and upsert a stream of videos into the vector collection.
+
+    Rows are read lazily and grouped into batches. Each batch is one
+    embeddings call and one upsert. Up to `concurrency` batches are in flight,
+    and their upserts run on separate pooled connections. The checkpoint only
+    advances past a batch once every earlier batch is stored, so a restart
+    redoes at most the batches that were in flight.
+
+    With link_keywords, each stored batch is also matched against the blocked
+    keywords (see keyword_service.match_new_videos) before it counts as done.
+
+    :param videos: (resume position, row) pairs, e.g. from iter_table_videos.
+    :param db: The SupabaseVectorDB instance.
+    :param ai_client: The AIClient used for embeddings.
+    :param checkpoint: Where progress is recorded, if resuming is wanted.
+    :param batch_size: Videos per embeddings call and upsert.
+    :param concurrency: Maximum batches in flight.
+    :param report_every: Seconds between progress reports.
+    :param on_progress: Called with the stats dict at each report.
+    :param link_keywords: Writes keyword links for a batch of (video id, embedding) pairs.
+    :return: Final stats: vectors, skipped, links, seconds and vectors_per_second.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    stats = {'vectors': 0, 'skipped': 0, 'links': 0}
+    base_vectors = checkpoint.vectors if checkpoint else 0
+    # Batches complete out of order; the checkpoint follows the contiguous prefix
+    finished = {}
+    next_to_commit = 0
+    last_report = start
+    failure: List[BaseException] = []
+
+    def report(final: bool = False):
+        elapsed = time.perf_counter() - start
+        current = {
+            **stats,
+            'seconds': elapsed,
+            'vectors_per_second': stats['vectors'] / elapsed if elapsed else 0.0
+        }
+        if on_progress is not None:
+            on_progress(current)
+        logger.info(
+            f"{'Ingested' if final else 'Ingesting'}: {stats['vectors']} vectors, "
+            f"{stats['skipped']} skipped, {stats['links']} keyword links, "
+            f"{current['vectors_per_second']:.1f} vectors/s"
+        )
+        return current
+
+    def commit(sequence: int, position):
+        nonlocal next_to_commit
+        finished[sequence] = position
+        while next_to_commit in finished:
+            position = finished.pop(next_to_commit)
+            next_to_commit += 1
+            if checkpoint is not None:
+                checkpoint.save(position, base_vectors + stats['vectors'])
+
+    async def process(sequence: int, batch: List[Tuple[object, dict]]):
+        nonlocal last_report
+        try:
+            rows = [(position, video, video_text(video)) for position, video in batch]
+            embeddable = [(video, text) for _, video, text in rows if text]
+            stats['skipped'] += len(rows) - len(embeddable)
+            if embeddable:
+                embeddings = await ai_client.embed([text for _, text in embeddable])
+                records = [
+                    (str(video['id']), embedding, {'title': video.get('title')})
+                    for (video, _), embedding in zip(embeddable, embeddings)
+                ]
+                await run_sync(db.add_vectors, records, batch_size=len(records))
+                if link_keywords is not None:
+                    links = await link_keywords([(id_, embedding) for id_, embedding, _ in records])
+                    stats['links'] += links
+                stats['vectors'] += len(records)
+            commit(sequence, batch[-1][0])
+            if time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                report()
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            slots.release()
+
+    tasks = set()
+    batch: List[Tuple[object, dict]] = []
+    sequence = 0
+
+    async def submit():
+        nonlocal batch, sequence
+        await slots.acquire()
+        task = asyncio.create_task(process(sequence, batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sequence += 1
+        batch = []
+
+    async for position, video in videos:
+        if failure:
+            break
+        batch.append((position, video))
+        if len(batch) >= batch_size:
+            await submit()
+    if batch and not failure:
+        await submit()
+    await asyncio.gather(*tasks)
+
+    if failure:
+        logger.error(f"Ingestion stopped: {str(failure[0])}")
+        raise failure[0]
+    return report(final=True)
@@ -1,114 +1,466 @@
-import openai
 from models.keywords import KeywordBase
-from utils.auth import get_supabase_vector_db
+from utils.supabase_vector import SupabaseVectorDB
+from utils.ai_client import AIClient
+from utils.text import normalize_text
+from utils.blocked_sets import BlockedVideoSets
+from utils.metrics import span
+from utils.concurrency import run_sync
+from utils.cache import TTLCache
 from config.logger import logger
-from config.settings import OPENAI_API_KEY
-from supabase import Client
+from config.settings import KEYWORD_MATCH_MAX_DISTANCE, KEYWORD_MATCH_MAX_RESULTS
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from supabase import AsyncClient
 
+# Cosine distance, not similarity: 0.25 keeps videos with similarity >= 0.75
+MATCH_MAX_DISTANCE = float(KEYWORD_MATCH_MAX_DISTANCE)
+MATCH_MAX_RESULTS = int(KEYWORD_MATCH_MAX_RESULTS)
+# pgvector rejects hnsw.ef_search above 1000
+MAX_EF_SEARCH = 1000
 
-async def generate_embedding(text):
+
+async def generate_embedding(text, ai_client: AIClient):
     """
     Generate an embedding for the given text using OpenAI's embedding model.
     
     :param text: The input text to generate an embedding for.
+    :param ai_client: The shared AIClient (its embedding cache is consulted first).
     :return: A list representing the embedding vector.
     """
-    openai.api_key = OPENAI_API_KEY
-    
-    response = openai.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    
-    embedding = response.data[0].embedding
-    return embedding
+    return await ai_client.embed_one(text)
 
 
-async def query_database(db, query_text, limit=5, similarity_threshold=0.75):
+async def query_database(db, query_text, ai_client: AIClient, max_distance=MATCH_MAX_DISTANCE, max_results=MATCH_MAX_RESULTS):
     """
-    Query the database for similar vectors based on the input text and return only video_ids.
+    Query the database for every video within a cosine distance of the input text.
     
     :param db: The SupabaseVectorDB instance.
     :param query_text: The input text to search for similar entries.
-    :param limit: The maximum number of results to return (default: 5).
-    :param similarity_threshold: The minimum similarity score to include in results (default: 0.75).
-    :return: A list of video_ids, sorted by similarity.
+    :param ai_client: The shared AIClient used to embed the query text.
+    :param max_distance: The largest cosine distance counted as a match (default: 0.25, i.e. similarity 0.75).
+    :param max_results: Safety cap on the number of matches (default: KEYWORD_MATCH_MAX_RESULTS).
+    :return: A list of video_ids, nearest first.
     """
     # Generate embedding for the query text
-    query_embedding = await generate_embedding(query_text)
+    query_embedding = await generate_embedding(query_text, ai_client)
+    return await _radius_matches(db, query_text, query_embedding, max_distance, max_results)
+
+
+async def _radius_matches(db, word, embedding, max_distance, max_results) -> List[str]:
+    """
+    Run a range search for one keyword embedding and return the matching video_ids.
+
+    :param db: The SupabaseVectorDB instance.
+    :param word: The keyword, for logging.
+    :param embedding: The keyword's embedding.
+    :param max_distance: The largest cosine distance counted as a match.
+    :param max_results: Safety cap on the number of matches.
+    :return: A list of video_ids, nearest first.
+    """
+    rows = await run_sync(
+        db.query_radius,
+        embedding,
+        radius=max_distance,
+        max_results=max_results,
+        ef_search=min(max_results, MAX_EF_SEARCH)
+    )
+    if len(rows) >= max_results:
+        logger.warning(f"Keyword '{word}' matched at least {max_results} videos; keeping the nearest {max_results}")
+    return [video_id for video_id, _ in rows]
 
-    # Query the database
-    query_result = db.query_vectors(
-        query_vector=query_embedding,
-        limit=limit
+
+async def _radius_matches_batch(db, words, embeddings, max_distance, max_results) -> List[List[str]]:
+    """
+    Run the range searches for several keyword embeddings in one batched query.
+
+    :param db: The SupabaseVectorDB instance.
+    :param words: The keywords, for logging.
+    :param embeddings: The keywords' embeddings, in the order of words.
+    :param max_distance: The largest cosine distance counted as a match.
+    :param max_results: Safety cap on the number of matches per keyword.
+    :return: One list of video_ids per keyword, nearest first.
+    """
+    batch = await run_sync(
+        db.query_radius_batch,
+        embeddings,
+        radius=max_distance,
+        max_results=max_results,
+        ef_search=min(max_results, MAX_EF_SEARCH)
     )
+    for word, rows in zip(words, batch):
+        if len(rows) >= max_results:
+            logger.warning(f"Keyword '{word}' matched at least {max_results} videos; keeping the nearest {max_results}")
+    return [[video_id for video_id, _ in rows] for rows in batch]
 
-    # Process the results
-    results = []
-    for item in query_result:
-        video_id = item[0]
-        similarity_score = item[1]
-        
-        # Filter results based on similarity threshold
-        if similarity_score >= similarity_threshold:
-            results.append((video_id, similarity_score))
 
-    # Sort results by similarity score in descending order
-    results.sort(key=lambda x: x[1], reverse=True)
+async def _store_keyword_embeddings(keyword_db: Optional[SupabaseVectorDB], keywords: List[Tuple[str, str, list]]):
+    """
+    Save keyword embeddings in the keyword collection so new videos can be matched against them.
 
-    # Return only the video_ids
-    return [video_id for video_id, _ in results]
+    :param keyword_db: The keyword SupabaseVectorDB, or None to skip.
+    :param keywords: (keyword id, word, embedding) triples.
+    """
+    if keyword_db is not None and keywords:
+        await run_sync(
+            keyword_db.add_vectors,
+            [(keyword_id, embedding, {'word': word}) for keyword_id, word, embedding in keywords]
+        )
 
 
-async def process_keyword(keyword: KeywordBase, user_id: str, supabase: Client):
-    try:
-        # Initialize the SupabaseVectorDB
-        db = await get_supabase_vector_db()
-
-        # Run similarity search
-        similar_videos = await query_database(db, keyword.word)
-
-        if similar_videos:
-            # Add the keyword to the keywords table
-            keyword_response = supabase.table('keywords').insert({
-                'word': keyword.word
-            }).execute()
-            keyword_id = keyword_response.data[0]['id']
-
-            # Add the keyword data to user_blocked_keywords table
-            supabase.table('user_blocked_keywords').insert({
-                'user_id': user_id,
-                'keyword_id': keyword_id
-            }).execute()
-
-            # For each video_id returned from the list, add an entry to video_keywords table
-            for video_id in similar_videos:
-                supabase.table('video_keywords').insert({
-                    'video_id': video_id,
-                    'keyword_id': keyword_id
-                }).execute()
-
-            logger.info(f"Keyword '{keyword.word}' processed and added for user {user_id}")
-            return {
-                "success": True,
-                "message": f"Keyword '{keyword.word}' processed successfully",
-                "keyword_id": keyword_id,
-                "affected_videos": len(similar_videos)
-            }
+async def match_new_videos(
+    supabase: AsyncClient,
+    keyword_db: SupabaseVectorDB,
+    videos: List[Tuple[str, list]],
+    max_distance=MATCH_MAX_DISTANCE,
+    max_results=MATCH_MAX_RESULTS,
+    registry: Optional[TTLCache] = None
+) -> int:
+    """
+    Link newly ingested videos to the stored keywords they match.
+
+    The reverse of the search in process_keyword: the batch of video embeddings
+    is compared with every keyword embedding in one range search, so the cost
+    grows with the new videos rather than with videos x keywords. Links that
+    already exist are skipped by the upsert, and the match counts of the
+    keywords that gained links are recounted.
+
+    :param supabase: The Supabase client.
+    :param keyword_db: The keyword SupabaseVectorDB.
+    :param videos: (video id, embedding) pairs.
+    :param max_distance: The largest cosine distance counted as a match.
+    :param max_results: Safety cap on the number of keywords matched per video.
+    :param registry: In-memory cache of registered keywords to drop recounted words from, if any.
+    :return: The number of links written.
+    """
+    if not videos:
+        return 0
+    matches = await run_sync(
+        keyword_db.query_radius_batch,
+        [embedding for _, embedding in videos],
+        radius=max_distance,
+        max_results=max_results,
+        ef_search=min(max_results, MAX_EF_SEARCH)
+    )
+    links = [
+        (keyword_id, video_id)
+        for (video_id, _), keywords in zip(videos, matches)
+        for keyword_id, _ in keywords
+    ]
+    await _link_videos(supabase, links)
+    await _refresh_match_counts(supabase, registry, list(dict.fromkeys(keyword_id for keyword_id, _ in links)))
+    return len(links)
+
+
+async def _upsert_keywords(supabase: AsyncClient, words: List[str]) -> Dict[str, str]:
+    """
+    Insert normalized keywords, reusing existing rows for words already stored.
+
+    :param supabase: The Supabase client.
+    :param words: Normalized keyword strings.
+    :return: A mapping of word to keyword id.
+    """
+    with span("supabase.keywords.upsert"):
+        response = await supabase.table('keywords').upsert(
+            [{'word': word} for word in dict.fromkeys(words)],
+            on_conflict='word'
+        ).execute()
+    return {row['word']: row['id'] for row in response.data}
+
+
+async def _link_videos(supabase: AsyncClient, links: List[Tuple[str, str]]):
+    """
+    Write (keyword_id, video_id) links in one request, skipping links that already exist.
+
+    :param supabase: The Supabase client.
+    :param links: Pairs of keyword id and video id.
+    """
+    rows = [
+        {'keyword_id': keyword_id, 'video_id': video_id}
+        for keyword_id, video_id in dict.fromkeys(links)
+    ]
+    if rows:
+        with span("supabase.video_keywords.upsert"):
+            await supabase.table('video_keywords').upsert(
+                rows,
+                on_conflict='video_id,keyword_id',
+                ignore_duplicates=True
+            ).execute()
+
+
+async def _block_for_user(supabase: AsyncClient, user_id: str, keyword_ids: List[str]):
+    """
+    Add keywords to a user's block list, skipping keywords already blocked.
+
+    :param supabase: The Supabase client.
+    :param user_id: The user blocking the keywords.
+    :param keyword_ids: Keyword ids to block.
+    """
+    rows = [
+        {'user_id': user_id, 'keyword_id': keyword_id}
+        for keyword_id in dict.fromkeys(keyword_ids)
+    ]
+    if rows:
+        with span("supabase.user_blocked_keywords.upsert"):
+            await supabase.table('user_blocked_keywords').upsert(
+                rows,
+                on_conflict='user_id,keyword_id',
+                ignore_duplicates=True
+            ).execute()
+
+
+async def _lookup_registered(supabase: AsyncClient, registry: Optional[TTLCache], words: List[str]) -> Dict[str, dict]:
+    """
+    Find words whose match set is already stored, so blocking them needs no embedding or search.
+
+    A keyword is registered once its links are written and matched_at is set
+    (see _register_matches). The in-memory registry is checked first; the
+    remaining words are looked up in one select.
+
+    :param supabase: The Supabase client.
+    :param registry: In-memory cache of registered keywords, or None.
+    :param words: Normalized keyword strings.
+    :return: A mapping of word to {'id', 'match_count'} for registered words.
+    """
+    found = {}
+    missing = []
+    for word in words:
+        entry = registry.get(word) if registry is not None else None
+        if entry is not None:
+            found[word] = entry
         else:
-            logger.info(f"No similar videos found for keyword '{keyword.word}' for user {user_id}")
+            missing.append(word)
+    if missing:
+        with span("supabase.keywords.select"):
+            response = await supabase.table('keywords').select(
+                'id, word, matched_at, match_count'
+            ).in_('word', missing).execute()
+        for row in response.data:
+            if row.get('matched_at') is None:
+                continue
+            entry = {'id': row['id'], 'match_count': row.get('match_count') or 0}
+            found[row['word']] = entry
+            if registry is not None:
+                registry.set(row['word'], entry)
+    return found
+
+
+async def _register_matches(
+    supabase: AsyncClient,
+    registry: Optional[TTLCache],
+    keyword_ids: Dict[str, str],
+    matches: Dict[str, List[str]]
+):
+    """
+    Mark keywords as matched once their links are written, in one upsert.
+
+    :param supabase: The Supabase client.
+    :param registry: In-memory cache of registered keywords, or None.
+    :param keyword_ids: A mapping of word to keyword id.
+    :param matches: A mapping of word to the video ids linked to it.
+    """
+    matched_at = datetime.now(timezone.utc).isoformat()
+    with span("supabase.keywords.upsert"):
+        await supabase.table('keywords').upsert(
+            [
+                {'word': word, 'matched_at': matched_at, 'match_count': len(matches[word])}
+                for word in keyword_ids
+            ],
+            on_conflict='word'
+        ).execute()
+    if registry is not None:
+        for word, keyword_id in keyword_ids.items():
+            registry.set(word, {'id': keyword_id, 'match_count': len(matches[word])})
+
+
+async def _refresh_match_counts(supabase: AsyncClient, registry: Optional[TTLCache], keyword_ids: List[str]):
+    """
+    Recount the links of keywords that gained videos after they were registered.
+
+    The recount runs in the database, so it is exact however many writers
+    linked videos concurrently. Recounted words are dropped from the in-memory
+    registry, so its next lookup reads the new count.
+
+    :param supabase: The Supabase client.
+    :param registry: In-memory cache of registered keywords, or None.
+    :param keyword_ids: Keyword ids whose links changed.
+    """
+    if not keyword_ids:
+        return
+    with span("supabase.rpc.refresh_keyword_match_counts"):
+        response = await supabase.rpc('refresh_keyword_match_counts', {'keyword_ids': keyword_ids}).execute()
+    if registry is not None:
+        for row in response.data:
+            registry.delete(row['word'])
+
+
+async def _keyword_videos(supabase: AsyncClient, keyword_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Read the stored match sets of keywords.
+
+    :param supabase: The Supabase client.
+    :param keyword_ids: Keyword ids.
+    :return: A mapping of keyword id to linked video ids.
+    """
+    with span("supabase.video_keywords.select"):
+        response = await supabase.table('video_keywords').select(
+            'keyword_id, video_id'
+        ).in_('keyword_id', keyword_ids).execute()
+    videos = {keyword_id: [] for keyword_id in keyword_ids}
+    for row in response.data:
+        videos[row['keyword_id']].append(row['video_id'])
+    return videos
+
+
+async def _block_registered(
+    supabase: AsyncClient,
+    user_id: str,
+    registered: Dict[str, dict],
+    blocked_sets: Optional[BlockedVideoSets]
+):
+    """
+    Block registered keywords for a user: one insert, plus a read of their match sets
+    only when the user's blocked-video set is materialized or being loaded.
+    """
+    keyword_ids = [entry['id'] for entry in registered.values()]
+    await _block_for_user(supabase, user_id, keyword_ids)
+    if blocked_sets is not None and blocked_sets.is_tracked(user_id):
+        for keyword_id, video_ids in (await _keyword_videos(supabase, keyword_ids)).items():
+            blocked_sets.block_keyword(user_id, keyword_id, video_ids)
+
+
+async def process_keyword(
+    keyword: KeywordBase,
+    user_id: str,
+    supabase: AsyncClient,
+    db: SupabaseVectorDB,
+    ai_client: AIClient,
+    blocked_sets: Optional[BlockedVideoSets] = None,
+    keyword_db: Optional[SupabaseVectorDB] = None,
+    registry: Optional[TTLCache] = None
+):
+    word = normalize_text(keyword.word)
+    try:
+        # Another user already blocked this word: its links are stored, only the block is new
+        registered = (await _lookup_registered(supabase, registry, [word])).get(word)
+        if registered is not None:
+            await _block_registered(supabase, user_id, {word: registered}, blocked_sets)
+            logger.info(f"Keyword '{word}' added for user {user_id} from the keyword registry")
             return {
                 "success": True,
-                "message": f"No similar videos found for keyword '{keyword.word}'",
-                "keyword_id": None,
-                "affected_videos": 0
+                "message": f"Keyword '{word}' processed successfully",
+                "keyword_id": registered['id'],
+                "affected_videos": registered['match_count']
             }
 
+        # The keyword is stored, registered and blocked even without matches: videos
+        # ingested later are matched against its stored embedding. The embedding is
+        # stored before the search, so every video is either already visible to the
+        # search or ingested after the embedding and matched by match_new_videos.
+        # Every write below is an upsert, so a retried request leaves the same rows behind.
+        # Video links are written before the user's block so a partial failure never
+        # leaves a blocked keyword without its links.
+        embedding = await generate_embedding(word, ai_client)
+        keyword_id = (await _upsert_keywords(supabase, [word]))[word]
+        await _store_keyword_embeddings(keyword_db, [(keyword_id, word, embedding)])
+        similar_videos = await _radius_matches(db, word, embedding, MATCH_MAX_DISTANCE, MATCH_MAX_RESULTS)
+
+        await _link_videos(supabase, [(keyword_id, video_id) for video_id in similar_videos])
+        await _register_matches(supabase, registry, {word: keyword_id}, {word: similar_videos})
+        await _block_for_user(supabase, user_id, [keyword_id])
+        if blocked_sets is not None:
+            blocked_sets.block_keyword(user_id, keyword_id, similar_videos)
+
+        logger.info(f"Keyword '{word}' processed and added for user {user_id} ({len(similar_videos)} matching videos)")
+        return {
+            "success": True,
+            "message": f"Keyword '{word}' processed successfully",
+            "keyword_id": keyword_id,
+            "affected_videos": len(similar_videos)
+        }
+
     except Exception as e:
-        logger.error(f"Error processing keyword '{keyword.word}' for user {user_id}: {str(e)}")
+        logger.error(f"Error processing keyword '{word}' for user {user_id}: {str(e)}")
         return {
             "success": False,
             "message": f"Error processing keyword: {str(e)}",
             "keyword_id": None,
             "affected_videos": 0
-        }
\ No newline at end of file
+        }
+
+
+async def process_keywords_bulk(
+    words: List[str],
+    user_id: str,
+    supabase: AsyncClient,
+    db: SupabaseVectorDB,
+    ai_client: AIClient,
+    blocked_sets: Optional[BlockedVideoSets] = None,
+    keyword_db: Optional[SupabaseVectorDB] = None,
+    registry: Optional[TTLCache] = None,
+    max_distance=MATCH_MAX_DISTANCE,
+    max_results=MATCH_MAX_RESULTS
+):
+    """
+    Block several keywords at once.
+
+    Words another user already blocked are only added to the user's block
+    list. The rest are embedded in one embeddings call and searched in one
+    batched range query, then the matches are written with the same upserts
+    as a single keyword.
+
+    :param words: Keywords as entered by the user.
+    :param user_id: The user blocking the keywords.
+    :param supabase: The Supabase client.
+    :param db: The SupabaseVectorDB instance.
+    :param ai_client: The shared AIClient.
+    :param blocked_sets: Materialized blocked-video sets to update, if enabled.
+    :param keyword_db: The keyword collection that stores keyword embeddings, if enabled.
+    :param registry: In-memory cache of registered keywords, if enabled.
+    :param max_distance: The largest cosine distance counted as a match.
+    :param max_results: Safety cap on the number of matches per keyword.
+    :return: A list with one result per distinct normalized word.
+    """
+    words = [word for word in dict.fromkeys(normalize_text(w) for w in words) if word]
+    if not words:
+        return []
+
+    registered = await _lookup_registered(supabase, registry, words)
+    if registered:
+        await _block_registered(supabase, user_id, registered, blocked_sets)
+
+    new_words = [word for word in words if word not in registered]
+    matches = {}
+    keyword_ids = {}
+    # Words without matches are stored and blocked too, for videos ingested later.
+    # Embeddings are stored before the search, as in process_keyword.
+    if new_words:
+        embeddings = dict(zip(new_words, await ai_client.embed(new_words)))
+        keyword_ids = await _upsert_keywords(supabase, new_words)
+        await _store_keyword_embeddings(keyword_db, [
+            (keyword_ids[word], word, embeddings[word]) for word in new_words
+        ])
+        match_lists = await _radius_matches_batch(db, new_words, list(embeddings.values()), max_distance, max_results)
+        matches = dict(zip(new_words, match_lists))
+        await _link_videos(supabase, [
+            (keyword_ids[word], video_id)
+            for word in new_words
+            for video_id in matches[word]
+        ])
+        await _register_matches(supabase, registry, keyword_ids, matches)
+        await _block_for_user(supabase, user_id, [keyword_ids[word] for word in new_words])
+        if blocked_sets is not None:
+            for word in new_words:
+                blocked_sets.block_keyword(user_id, keyword_ids[word], matches[word])
+
+    logger.info(
+        f"Processed {len(words)} keywords for user {user_id} "
+        f"({len(registered)} from the registry, {len(new_words)} newly searched)"
+    )
+    return [
+        {
+            "word": word,
+            "keyword_id": registered[word]['id'] if word in registered else keyword_ids[word],
+            "affected_videos": registered[word]['match_count'] if word in registered else len(matches[word])
+        }
+        for word in words
+    ]
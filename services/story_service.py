@@ -1,104 +1,270 @@
-import time
-import openai
+import hashlib
+import json
+import random
+import uuid
 from fastapi import HTTPException
-from supabase import Client
+from supabase import AsyncClient
+from utils.ai_client import AIClient
+from utils.responses import project_rows
+from utils.metrics import span
+from utils.text import normalize_text
 from models.stories import GeneratedStoryCreate, GeneratedStory
 from config.logger import logger
-from typing import List
-import os
+from config.settings import STORY_CACHE, STORY_CACHE_REUSE_RATIO
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+STORY_CACHE_ENABLED = STORY_CACHE.lower() == "true"
+# Stored stories considered when picking one to reuse
+STORY_CACHE_CANDIDATES = 50
+
+
+def story_cache_key(story: GeneratedStoryCreate) -> str:
+    """Digest of the normalized (topic, sorted characters, duration) request."""
+    key = json.dumps([
+        normalize_text(story.topic),
+        sorted(normalize_text(character) for character in story.characters),
+        story.duration
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 
 class StoryService:
-    def __init__(self, supabase: Client):
+    def __init__(self,
+                 supabase: AsyncClient,
+                 ai_client: AIClient,
+                 cache_enabled: bool = STORY_CACHE_ENABLED,
+                 reuse_ratio: float = float(STORY_CACHE_REUSE_RATIO)):
+        """
+        :param supabase: The Supabase client
+        :param ai_client: The shared AIClient
+        :param cache_enabled: Reuse stored stories for identical requests
+        :param reuse_ratio: Share of cacheable requests served from stored stories;
+                            the rest generate a new variant
+        """
         self.supabase = supabase
+        self.ai_client = ai_client
+        self.cache_enabled = cache_enabled
+        self.reuse_ratio = reuse_ratio
 
-    def generate_story(self, topic, characters, duration):
+    def _build_messages(self, topic, characters, duration):
         characters_str = ", ".join(characters)
         prompt = f"""Write a short, kid-friendly story about {topic} featuring the following characters: {characters_str}. Start the story with a fun title. The story should be {duration} minutes long. Make sure the story is engaging, fun, and appropriate for pre-schoolers, incorporating all the selected characters in a meaningful way.
         Think before you write the story. First, consider the age group of pre-schoolers and what themes, language, and story structures would be most appropriate and engaging for them. Then, reflect on how each of the selected characters can be meaningfully integrated into the story about the given topic, ensuring each character has a purpose and contributes to the narrative. Consider how the topic can be explored in a way that is both educational and entertaining for young children. Finally, plan the story arc to include a clear beginning, middle, and end, with a simple but valuable lesson or takeaway appropriate for pre-schoolers. After this careful consideration, write the short, kid-friendly story, keeping it within {duration} minutes and maintaining an engaging, fun, and age-appropriate tone throughout.
         DO NOT OUTPUT INFORMATION LIKE WORD COUNT, THE ENDING, OR ANYTHING ELSE. JUST WRITE THE STORY.
         """
 
-        response = openai.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that creates kid-friendly stories."},
-                {"role": "user", "content": prompt}
-            ],
+        return [
+            {"role": "system", "content": "You are a helpful assistant that creates kid-friendly stories."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def generate_story(self, topic, characters, duration):
+        generated_story = await self.ai_client.chat(
+            messages=self._build_messages(topic, characters, duration),
             max_tokens=5000
         )
-        generated_story = response.choices[0].message.content
 
         return generated_story
 
-    def get_audio_file(self, text, user_id):
-        response = openai.audio.speech.create(
-            model="tts-1",
-            voice="alloy",
-            input=text,
-        )
+    async def get_audio_file(self, text, user_id):
+        audio = await self.ai_client.speech(text)
+        return await self.upload_audio(audio, user_id)
 
-        # Generate a unique filename using a timestamp
-        filename = f"output_{int(time.time())}.mp3"
-        
-        # Write the file temporarily
-        response.write_to_file(filename)
+    async def upload_audio(self, audio: bytes, user_id):
+        if self.cache_enabled:
+            # Content-addressed, so every story reusing this audio points at one object
+            path = f"shared/{hashlib.sha256(audio).hexdigest()}.mp3"
+            file_options = {"content-type": "audio/mpeg", "upsert": "true"}
+        else:
+            # A random object key keeps concurrent uploads for the same user from colliding
+            path = f"{user_id}/{uuid.uuid4().hex}.mp3"
+            file_options = {"content-type": "audio/mpeg"}
 
         try:
-            # Upload the file to Supabase storage
-            with open(filename, 'rb') as f:
-                res = self.supabase.storage.from_('audio_files').upload(
-                    file=f,
-                    path=f"{user_id}/{filename}",
-                    file_options={"content-type": "audio/mpeg"}
+            # Upload the audio bytes straight from memory to Supabase storage
+            with span("supabase.storage.upload"):
+                await self.supabase.storage.from_('audio_files').upload(
+                    file=audio,
+                    path=path,
+                    file_options=file_options
                 )
 
             # Get the public URL
-            public_url = self.supabase.storage.from_('audio_files').get_public_url(f"{user_id}/{filename}")
-
-            # Remove the temporary file
-            os.remove(filename)
-
-            return public_url
+            return await self.supabase.storage.from_('audio_files').get_public_url(path)
 
         except Exception as e:
             logger.error(f"Error uploading audio file to Supabase: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to upload audio file")
 
 
-    async def create_story(self, story: GeneratedStoryCreate, user_id: str) -> GeneratedStory:
+    async def create_story(
+        self,
+        story: GeneratedStoryCreate,
+        user_id: str,
+        on_stage: Optional[Callable[[str, float], None]] = None
+    ) -> GeneratedStory:
+        on_stage = on_stage or (lambda stage, progress: None)
         try:
+            cache_key = story_cache_key(story) if self.cache_enabled else None
+            cached = await self._find_cached(cache_key, user_id)
+            if cached is not None:
+                logger.info(f"Reusing a stored story for user {user_id}")
+                on_stage("saving", 0.95)
+                return await self._save_story(story, user_id, cached['story_text'], cached['audio_url'], cache_key)
+
             # Generate the story text
-            story_text = self.generate_story(story.topic, story.characters, story.duration)
+            on_stage("generating_text", 0.0)
+            story_text = await self.generate_story(story.topic, story.characters, story.duration)
             
-            # Generate the audio file and get its public URL
-            audio_url = self.get_audio_file(story_text, user_id)
+            # Render the audio, then upload it and get its public URL
+            on_stage("rendering_audio", 0.6)
+            audio = await self.ai_client.speech(story_text)
+            on_stage("uploading_audio", 0.85)
+            audio_url = await self.upload_audio(audio, user_id)
             
-            # Prepare data for database insertion
-            story_data = {
-                "user_id": user_id,
-                "topic": story.topic,
-                "characters": story.characters,
-                "duration": story.duration,
-                "story_text": story_text,
-                "audio_url": audio_url
-            }
-            
-            # Insert into database
-            response = self.supabase.table("generated_stories").insert(story_data).execute()
-            
-            if response.data:
-                return GeneratedStory(**response.data[0])
-            else:
-                raise HTTPException(status_code=500, detail="Failed to create story in database")
+            on_stage("saving", 0.95)
+            return await self._save_story(story, user_id, story_text, audio_url, cache_key)
         except Exception as e:
             logger.error(f"Error in create_story: {str(e)}")
             raise HTTPException(status_code=500, detail="An error occurred while creating the story")
 
 
+    async def stream_story(self, story: GeneratedStoryCreate, user_id: str) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Create a story while streaming progress as (event, data) pairs.
+
+        Events, in order: 'title' once the first line is complete, 'token' for
+        each chunk of story text, 'audio' when the audio URL is ready and 'story'
+        with the saved record. Failures end the stream with an 'error' event.
+        """
+        try:
+            cache_key = story_cache_key(story) if self.cache_enabled else None
+            cached = await self._find_cached(cache_key, user_id)
+            if cached is not None:
+                logger.info(f"Reusing a stored story for user {user_id}")
+                first_line, newline, rest = cached['story_text'].lstrip().partition("\n")
+                if newline:
+                    yield "title", {"title": _clean_title(first_line)}
+                yield "token", {"text": rest if newline else first_line}
+                yield "audio", {"audio_url": cached['audio_url']}
+                saved = await self._save_story(story, user_id, cached['story_text'], cached['audio_url'], cache_key)
+                yield "story", saved.model_dump(mode="json")
+                return
+
+            chunks = []
+            pending = ""
+            title_sent = False
+            async for delta in self.ai_client.chat_stream(
+                messages=self._build_messages(story.topic, story.characters, story.duration),
+                max_tokens=5000
+            ):
+                chunks.append(delta)
+                if title_sent:
+                    yield "token", {"text": delta}
+                    continue
+
+                pending += delta
+                first_line, newline, rest = pending.lstrip().partition("\n")
+                if newline:
+                    title_sent = True
+                    yield "title", {"title": _clean_title(first_line)}
+                    if rest:
+                        yield "token", {"text": rest}
+
+            if not title_sent and pending:
+                yield "token", {"text": pending}
+
+            story_text = "".join(chunks)
+            audio_url = await self.get_audio_file(story_text, user_id)
+            yield "audio", {"audio_url": audio_url}
+
+            saved = await self._save_story(story, user_id, story_text, audio_url, cache_key)
+            yield "story", saved.model_dump(mode="json")
+        except Exception as e:
+            logger.error(f"Error in stream_story: {str(e)}")
+            yield "error", {"detail": "An error occurred while creating the story"}
+
+
+    async def _find_cached(self, cache_key: Optional[str], user_id: str) -> Optional[dict]:
+        """
+        Pick a stored story for the same request, or None to generate a new one.
+
+        A new story is generated for 1 - reuse_ratio of requests, and whenever
+        the user already has every stored variant.
+        """
+        if cache_key is None or random.random() >= self.reuse_ratio:
+            return None
+        with span("supabase.generated_stories.select"):
+            response = await self.supabase.table("generated_stories").select(
+                "user_id, story_text, audio_url"
+            ).eq("cache_key", cache_key).limit(STORY_CACHE_CANDIDATES).execute()
+        seen = {row['audio_url'] for row in response.data if str(row['user_id']) == str(user_id)}
+        candidates = {row['audio_url']: row for row in response.data if row['audio_url'] not in seen}
+        return random.choice(list(candidates.values())) if candidates else None
+
+
+    async def _save_story(self, story: GeneratedStoryCreate, user_id: str, story_text: str, audio_url: str, cache_key: Optional[str] = None) -> GeneratedStory:
+        # Prepare data for database insertion
+        story_data = {
+            "user_id": user_id,
+            "topic": story.topic,
+            "characters": story.characters,
+            "duration": story.duration,
+            "story_text": story_text,
+            "audio_url": audio_url
+        }
+        if cache_key is not None:
+            story_data["cache_key"] = cache_key
+        
+        # Insert into database
+        with span("supabase.generated_stories.insert"):
+            response = await self.supabase.table("generated_stories").insert(story_data).execute()
+        
+        if response.data:
+            return GeneratedStory(**response.data[0])
+        else:
+            raise HTTPException(status_code=500, detail="Failed to create story in database")
+
+
+    async def get_story_rows(self, user_id: str) -> List[dict]:
+        """Fetch a user's stories as raw rows, for the fast response path."""
+        try:
+            with span("supabase.generated_stories.select"):
+                response = await self.supabase.table("generated_stories").select("*").eq("user_id", user_id).execute()
+            return project_rows(response.data, GeneratedStory)
+        except Exception as e:
+            logger.error(f"Error in get_story_rows: {str(e)}")
+            raise HTTPException(status_code=500, detail="An error occurred while fetching stories")
+
+
     async def get_stories(self, user_id: str) -> List[GeneratedStory]:
         try:
-            response = self.supabase.table("generated_stories").select("*").eq("user_id", user_id).execute()
+            with span("supabase.generated_stories.select"):
+                response = await self.supabase.table("generated_stories").select("*").eq("user_id", user_id).execute()
             return [GeneratedStory(**story) for story in response.data]
         except Exception as e:
             logger.error(f"Error in get_stories: {str(e)}")
-            raise HTTPException(status_code=500, detail="An error occurred while fetching stories")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail="An error occurred while fetching stories")
+
+
+def make_story_job_handler(supabase: AsyncClient, ai_client: AIClient):
+    """
+    Build the job queue handler that runs the story pipeline for a queued request.
+
+    The payload is {"story": GeneratedStoryCreate, "user_id": str}; the job's
+    stage and progress are updated as each pipeline step starts.
+    """
+    async def handle(job, payload) -> dict:
+        service = StoryService(supabase, ai_client)
+        story = await service.create_story(payload["story"], payload["user_id"], on_stage=job.set_stage)
+        return story.model_dump(mode="json")
+
+    return handle
+
+
+def _clean_title(line: str) -> str:
+    """Strip markdown and 'Title:' decoration from the story's first line."""
+    title = line.strip().strip("#*").strip()
+    if title.lower().startswith("title:"):
+        title = title[len("title:"):].strip()
+    return title.strip('"').strip()
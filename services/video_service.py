@@ -1,11 +1,13 @@
-from supabase import Client
+from supabase import AsyncClient
 from models.videos import AllowedVideo
-from typing import List
+from typing import List, Optional
+from utils.keyword_matcher import PreparedCatalog
 from config.logger import logger
 
 class VideoService:
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: AsyncClient):
         self.supabase = supabase
+        self._catalog: Optional[PreparedCatalog] = None
 
     async def get_allowed_videos(self, child_id: str) -> List[AllowedVideo]:
         try:
@@ -15,16 +17,11 @@ class VideoService:
             # Fetch blocked keywords for the child
             blocked_keywords = await self._get_blocked_keywords(child_id)
             
-            # Fetch all videos
-            all_videos = await self._get_all_videos()
+            # Load the catalog with its match text prepared
+            catalog = await self._get_catalog()
             
-            # Filter videos
-            allowed_videos = [
-                video for video in all_videos
-                if video.channel_id not in blocked_channels and
-                not any(keyword in video.title.lower() or keyword in video.description.lower() 
-                        for keyword in blocked_keywords)
-            ]
+            # Filter videos with one multi-keyword scan per video
+            allowed_videos = catalog.filter(blocked_channels, blocked_keywords)
             
             logger.info(f"Retrieved {len(allowed_videos)} allowed videos for child {child_id}")
             return allowed_videos
@@ -32,6 +29,15 @@ class VideoService:
             logger.error(f"Error getting allowed videos: {str(e)}")
             raise
 
+    async def _get_catalog(self) -> PreparedCatalog:
+        if self._catalog is None:
+            self._catalog = PreparedCatalog(await self._get_all_videos() or [])
+        return self._catalog
+
+    def invalidate_catalog(self):
+        """Drop the prepared catalog so the next call reloads it."""
+        self._catalog = None
+
     async def _get_blocked_channels(self, child_id: str) -> List[str]:
         # Implementation to fetch blocked channels from Supabase
         pass
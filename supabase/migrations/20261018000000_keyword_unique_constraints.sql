@@ -0,0 +1,50 @@
+-- Deduplicate keywords by normalized word and make keyword links idempotent,
+-- so process_keyword can write with upserts instead of blind inserts.
+
+-- Normalize stored words the same way utils/text.normalize_text does.
+update keywords
+set word = lower(btrim(regexp_replace(word, '\s+', ' ', 'g')));
+
+-- Pick one surviving row per word and repoint links at it. The table is dropped
+-- explicitly below rather than on commit, so this also works under autocommit.
+create temporary table keyword_remap as
+select id, first_value(id) over (partition by word order by id) as keep_id
+from keywords;
+
+update user_blocked_keywords ubk
+set keyword_id = r.keep_id
+from keyword_remap r
+where ubk.keyword_id = r.id and r.id <> r.keep_id;
+
+update video_keywords vk
+set keyword_id = r.keep_id
+from keyword_remap r
+where vk.keyword_id = r.id and r.id <> r.keep_id;
+
+-- Drop link rows that became duplicates after the repoint.
+delete from user_blocked_keywords a
+using user_blocked_keywords b
+where a.ctid < b.ctid
+  and a.user_id = b.user_id
+  and a.keyword_id = b.keyword_id;
+
+delete from video_keywords a
+using video_keywords b
+where a.ctid < b.ctid
+  and a.video_id = b.video_id
+  and a.keyword_id = b.keyword_id;
+
+delete from keywords k
+using keyword_remap r
+where k.id = r.id and r.id <> r.keep_id;
+
+drop table keyword_remap;
+
+alter table keywords
+    add constraint keywords_word_key unique (word);
+
+alter table user_blocked_keywords
+    add constraint user_blocked_keywords_user_keyword_key unique (user_id, keyword_id);
+
+alter table video_keywords
+    add constraint video_keywords_video_keyword_key unique (video_id, keyword_id);
@@ -0,0 +1,55 @@
+-- Keyset (cursor) pagination for /videos/feed.
+--
+-- Rows are ordered by (created_at desc, id desc). Each page seeks past the
+-- last row of the previous page instead of using an offset, so deep pages
+-- cost the same as the first one. Rows stay put when earlier rows are blocked
+-- mid-scroll.
+
+create index if not exists videos_created_at_id_idx
+    on videos (created_at desc, id desc);
+
+create or replace function get_allowed_videos_for_user_after(
+    user_uuid uuid,
+    p_limit integer,
+    p_after_created_at timestamptz default null,
+    p_after_id uuid default null
+)
+returns table (
+    video_id uuid,
+    external_id text,
+    title text,
+    description text,
+    channel_name text,
+    thumbnail_url text,
+    created_at timestamptz
+)
+language sql
+stable
+as $$
+    select
+        v.id as video_id,
+        v.external_id,
+        v.title,
+        v.description,
+        c.name as channel_name,
+        v.thumbnail_url,
+        v.created_at
+    from videos v
+    join channels c on c.id = v.channel_id
+    where (p_after_created_at is null or (v.created_at, v.id) < (p_after_created_at, p_after_id))
+      and not exists (
+          select 1
+          from user_blocked_channels ubc
+          where ubc.user_id = user_uuid
+            and ubc.channel_id = v.channel_id
+      )
+      and not exists (
+          select 1
+          from video_keywords vk
+          join user_blocked_keywords ubk on ubk.keyword_id = vk.keyword_id
+          where ubk.user_id = user_uuid
+            and vk.video_id = v.id
+      )
+    order by v.created_at desc, v.id desc
+    limit p_limit;
+$$;
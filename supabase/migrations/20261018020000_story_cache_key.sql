@@ -0,0 +1,14 @@
+-- Content-addressed story cache.
+--
+-- cache_key is the sha256 of the normalized (topic, sorted characters,
+-- duration) request; see services/story_service.story_cache_key. Rows that
+-- share a key are interchangeable stories, so a repeat request can copy the
+-- text and audio URL of an existing row instead of generating new ones.
+-- Stories created before the cache was enabled keep a null key.
+
+alter table generated_stories
+    add column if not exists cache_key text;
+
+create index if not exists generated_stories_cache_key_idx
+    on generated_stories (cache_key)
+    where cache_key is not null;
@@ -0,0 +1,13 @@
+-- Global keyword registry.
+--
+-- A keyword with matched_at set has its video_keywords links written (and its
+-- embedding stored in the keyword vector collection), so blocking the same
+-- word again only inserts a user_blocked_keywords row; see
+-- services/keyword_service._lookup_registered. match_count is the number of
+-- links written at matched_at; links added later by ingestion are not counted.
+-- Keywords stored before this migration keep a null matched_at and are
+-- matched again the next time someone blocks them.
+
+alter table keywords
+    add column if not exists matched_at timestamptz,
+    add column if not exists match_count integer;
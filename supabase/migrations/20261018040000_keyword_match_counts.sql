@@ -0,0 +1,22 @@
+-- Keep keywords.match_count current as ingestion links new videos.
+--
+-- The registry migration wrote match_count once, when a keyword was first
+-- matched. services/keyword_service.match_new_videos now calls this function
+-- for the keywords it linked videos to. Each count is recomputed from
+-- video_keywords, so concurrent ingestion workers cannot drift it. The words
+-- are returned so callers can drop them from their in-memory registry.
+
+create or replace function refresh_keyword_match_counts(keyword_ids uuid[])
+returns table (id uuid, word text, match_count integer)
+language sql
+as $$
+    update keywords k
+    set match_count = (
+        select count(*)::integer
+        from video_keywords vk
+        where vk.keyword_id = k.id
+    )
+    where k.id = any(keyword_ids)
+      and k.matched_at is not null
+    returning k.id, k.word, k.match_count;
+$$;
@@ -0,0 +1,111 @@
+import numpy as np
+from utils.blocked_sets import BlockedVideoSets, FeedCatalog
+
+
+def catalog_rows(n=8, channels=("c1", "c2")):
+    """Feed rows v0..v{n-1}, newest first, alternating between channels."""
+    return [
+        {"video_id": f"v{i}", "channel_id": channels[i % len(channels)], "created_at": f"2024-01-{31 - i:02d}"}
+        for i in range(n)
+    ]
+
+
+def allowed(sets, user_id):
+    return [row["video_id"] for row in sets.page(user_id, limit=100)]
+
+
+def test_changes_during_load_are_replayed_on_the_snapshot():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.begin_load("u1")
+    assert sets.is_tracked("u1") and not sets.is_loaded("u1")
+
+    # Blocked after the snapshot below was read, so the snapshot lacks them
+    sets.block_channel("u1", "c2")
+    sets.block_keyword("u1", "k1", ["v0"])
+    sets.load_user("u1", channel_ids=[], keyword_videos={})
+
+    assert allowed(sets, "u1") == ["v2", "v4", "v6"]
+    assert sets.is_loaded("u1")
+
+
+def test_unblock_during_load_wins_over_a_stale_snapshot():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.begin_load("u1")
+    sets.unblock_channel("u1", "c1")
+    sets.unblock_keyword("u1", "k1")
+    # The snapshot was read before the unblocks committed
+    sets.load_user("u1", channel_ids=["c1"], keyword_videos={"k1": ["v1"]})
+
+    assert allowed(sets, "u1") == [f"v{i}" for i in range(8)]
+    assert sets.stats()["keywords"] == 0
+
+
+def test_changes_for_untracked_users_are_not_recorded():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.block_channel("u1", "c1")
+    sets.load_user("u1", channel_ids=[], keyword_videos={})
+
+    assert allowed(sets, "u1") == [f"v{i}" for i in range(8)]
+
+
+def test_abort_load_stops_recording():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.begin_load("u1")
+    sets.block_channel("u1", "c1")
+    sets.abort_load("u1")
+    assert not sets.is_tracked("u1")
+
+    sets.load_user("u1", channel_ids=[], keyword_videos={})
+    assert allowed(sets, "u1") == [f"v{i}" for i in range(8)]
+
+
+def test_concurrent_loads_each_replay_the_changes():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.begin_load("u1")
+    sets.begin_load("u1")
+    sets.block_channel("u1", "c1")
+    sets.load_user("u1", channel_ids=[], keyword_videos={})
+    assert sets.is_tracked("u1")
+
+    # The slower load finishes with an older snapshot and still keeps the block
+    sets.load_user("u1", channel_ids=[], keyword_videos={})
+    assert allowed(sets, "u1") == ["v1", "v3", "v5", "v7"]
+
+
+def test_keyword_bitmap_is_shared_until_the_last_user_unblocks():
+    sets = BlockedVideoSets(FeedCatalog(catalog_rows()))
+    sets.load_user("u1", channel_ids=[], keyword_videos={"k1": ["v0", "v1"]})
+    sets.load_user("u2", channel_ids=[], keyword_videos={"k1": ["v0", "v1"]})
+    assert sets.stats()["keywords"] == 1
+
+    sets.add_keyword_links("k1", ["v2"])
+    assert allowed(sets, "u1") == allowed(sets, "u2") == ["v3", "v4", "v5", "v6", "v7"]
+
+    sets.unblock_keyword("u1", "k1")
+    assert allowed(sets, "u1") == [f"v{i}" for i in range(8)]
+    assert sets.stats()["keywords"] == 1
+    sets.unblock_keyword("u2", "k1")
+    assert sets.stats()["keywords"] == 0
+
+
+def test_rebase_keeps_users_and_remaps_their_blocks():
+    rows = catalog_rows(6)
+    sets = BlockedVideoSets(FeedCatalog(rows))
+    # v9 is linked before it reaches the catalog
+    sets.load_user("u1", channel_ids=["c2"], keyword_videos={"k1": ["v0", "v9"]})
+    assert allowed(sets, "u1") == ["v2", "v4"]
+
+    new_video = {"video_id": "v9", "channel_id": "c1", "created_at": "2024-02-01"}
+    other_new_video = {"video_id": "v10", "channel_id": "c1", "created_at": "2024-02-02"}
+    # v4 left the catalog; two newer videos arrived
+    catalog = FeedCatalog([other_new_video, new_video] + [row for row in rows if row["video_id"] != "v4"])
+    sets.rebase(catalog, new_links={"k1": ["v10"]})
+
+    assert sets.is_loaded("u1")
+    assert allowed(sets, "u1") == ["v2"]
+    assert np.array_equal(sets._users["u1"].bitmap & catalog.channel_bitmaps["c2"], catalog.channel_bitmaps["c2"])
+
+
+def test_catalog_digest_tracks_content():
+    assert FeedCatalog(catalog_rows()).digest == FeedCatalog(catalog_rows()).digest
+    assert FeedCatalog(catalog_rows()).digest != FeedCatalog(catalog_rows(7)).digest
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+import pytest
+import utils.cache
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(utils.cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_invalidate_tag_drops_only_tagged_entries():
+    cache = TTLCache()
+    cache.set(("u1", 1), "page 1", tags=["u1"])
+    cache.set(("u1", 2), "page 2", tags=["u1"])
+    cache.set(("u2", 1), "other", tags=["u2"])
+
+    assert cache.invalidate_tag("u1") == 2
+    assert cache.get(("u1", 1)) is None
+    assert cache.get(("u1", 2)) is None
+    assert cache.get(("u2", 1)) == "other"
+    assert cache.invalidate_tag("u1") == 0
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_overwritten_entry_loses_its_old_tags():
+    cache = TTLCache()
+    cache.set("key", "old", tags=["a"])
+    cache.set("key", "new", tags=["b"])
+
+    assert cache.invalidate_tag("a") == 0
+    assert cache.get("key") == "new"
+    assert cache.invalidate_tag("b") == 1
+
+
+def test_delete():
+    cache = TTLCache()
+    cache.set("zebra", {"id": "k1"}, tags=["t"])
+
+    assert cache.delete("zebra") is True
+    assert cache.delete("zebra") is False
+    assert cache.get("zebra") is None
+    assert cache.invalidate_tag("t") == 0
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(ttl=60)
+    cache.set("key", "value")
+
+    clock.now += 59
+    assert cache.get("key") == "value"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_weight_bound_evicts_least_recently_used():
+    cache = TTLCache(max_entries=10, max_weight=100)
+    cache.set("a", "rows", weight=50)
+    cache.set("b", "rows", weight=40)
+    cache.get("a")
+    cache.set("c", "rows", weight=30)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "rows"
+    assert cache.get("c") == "rows"
+    assert cache.stats()["weight"] == 80
+    assert cache.stats()["evictions"] == 1
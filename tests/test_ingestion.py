@@ -0,0 +1,67 @@
+import asyncio
+import json
+import pytest
+from services.ingestion_service import Checkpoint, ingest_videos, iter_jsonl_videos
+
+
+def write_export(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"v{i}", "title": f"video number {i}", "description": "dinosaurs"}) + "\n")
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "checkpoint.json")
+    Checkpoint(path, source="videos.jsonl").save(position=12, vectors=10)
+
+    checkpoint = Checkpoint(path, source="videos.jsonl")
+    assert (checkpoint.position, checkpoint.vectors) == (12, 10)
+    assert not (tmp_path / "state" / "checkpoint.json.tmp").exists()
+
+
+def test_checkpoint_for_another_source_is_ignored(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, source="table:videos").save(position="v9", vectors=10)
+
+    checkpoint = Checkpoint(path, source="videos.jsonl")
+    assert (checkpoint.position, checkpoint.vectors) == (None, 0)
+
+
+def test_interrupted_ingestion_resumes_from_the_checkpoint(tmp_path, monkeypatch, collections, vector_db, ai_client):
+    export = str(tmp_path / "videos.jsonl")
+    write_export(export, 10)
+    path = str(tmp_path / "checkpoint.json")
+    collection = collections["videos"]
+    upserted = []
+    upsert = collection.upsert
+
+    def recording_upsert(records, fail_after=None):
+        records = list(records)
+        if fail_after is not None and len(upserted) >= fail_after:
+            raise OSError("connection reset")
+        upserted.extend(id_ for id_, _, _ in records)
+        upsert(records)
+
+    async def run(checkpoint):
+        return await ingest_videos(
+            iter_jsonl_videos(export, after_line=checkpoint.position),
+            vector_db, ai_client, checkpoint=checkpoint, batch_size=2, concurrency=1
+        )
+
+    # The third batch fails after two were stored
+    monkeypatch.setattr(collection, "upsert", lambda records: recording_upsert(records, fail_after=4))
+    checkpoint = Checkpoint(path, source=export)
+    with pytest.raises(RuntimeError, match="connection reset"):
+        asyncio.run(run(checkpoint))
+    assert (checkpoint.position, checkpoint.vectors) == (4, 4)
+
+    monkeypatch.setattr(collection, "upsert", recording_upsert)
+    upserted.clear()
+    checkpoint = Checkpoint(path, source=export)
+    stats = asyncio.run(run(checkpoint))
+
+    assert upserted == [f"v{i}" for i in range(4, 10)]
+    assert stats["vectors"] == 6
+    assert (checkpoint.position, checkpoint.vectors) == (10, 10)
+    assert collection.index.ids() == {f"v{i}" for i in range(10)}
+    asyncio.run(ai_client.close())
@@ -0,0 +1,24 @@
+import pytest
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2024-07-21T10:00:00.12345+00:00", "3f0c2a6e-8a59-4c1e-9d3e-0f4a5b6c7d8e")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2024-07-21T10:00:00.12345+00:00", "3f0c2a6e-8a59-4c1e-9d3e-0f4a5b6c7d8e")
+
+
+def test_empty_cursor_is_the_start_of_the_feed():
+    assert decode_cursor("") is None
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    encode_cursor("yesterday", "v1"),
+    "WyIyMDI0LTA3LTIxIl0",  # a one-element list
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,81 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from utils.middleware import RateLimitMiddleware, RateLimitPolicy
+
+
+def make_app(policies):
+    app = FastAPI()
+
+    @app.get("/stories")
+    async def stories():
+        return {"ok": True}
+
+    @app.get("/stories/jobs")
+    async def jobs():
+        return {"ok": True}
+
+    @app.get("/feed")
+    async def feed():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, policies=policies)
+    return app
+
+
+def statuses(app, requests, client=("203.0.113.7", 1234)):
+    async def run():
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return [await http.get(path, headers=headers) for path, headers in requests]
+    return asyncio.run(run())
+
+
+def test_requests_over_the_limit_get_429_with_retry_after():
+    app = make_app([RateLimitPolicy("/stories", max_requests=2, duration=60)])
+    responses = statuses(app, [("/stories", {})] * 3)
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].json() == {"detail": "Rate limit exceeded"}
+    assert responses[2].headers["Retry-After"] == "30"
+
+
+def test_longest_prefix_has_its_own_bucket_and_unmatched_paths_are_unlimited():
+    app = make_app([
+        RateLimitPolicy("/stories", max_requests=1, duration=60),
+        RateLimitPolicy("/stories/jobs", max_requests=3, duration=60),
+    ])
+    responses = statuses(app, [("/stories", {})] * 2 + [("/stories/jobs", {})] * 3 + [("/feed", {})] * 5)
+
+    assert [r.status_code for r in responses] == [200, 429] + [200] * 8
+
+
+def test_per_user_policy_keys_by_bearer_token():
+    app = make_app([RateLimitPolicy("/stories", max_requests=1, duration=60, per="user")])
+    alice, bob = {"Authorization": "Bearer alice"}, {"Authorization": "Bearer bob"}
+    responses = statuses(app, [("/stories", alice), ("/stories", alice), ("/stories", bob)])
+
+    assert [r.status_code for r in responses] == [200, 429, 200]
+
+
+def test_bucket_refills_over_time():
+    policy = RateLimitPolicy("/stories", max_requests=2, duration=60)
+    limiter = RateLimitMiddleware(app=None, policies=[policy])
+
+    assert limiter._take(policy, "ip:a", now=0) is None
+    assert limiter._take(policy, "ip:a", now=0) is None
+    assert limiter._take(policy, "ip:a", now=10) == pytest.approx(20)
+    assert limiter._take(policy, "ip:a", now=30) is None
+
+
+def test_idle_buckets_are_evicted():
+    policy = RateLimitPolicy("", max_requests=1, duration=60)
+    limiter = RateLimitMiddleware(app=None, policies=[policy], max_keys=2)
+
+    for i, client in enumerate(["ip:a", "ip:b", "ip:c"]):
+        limiter._take(policy, client, now=i)
+    assert list(limiter.buckets) == [("", "ip:b"), ("", "ip:c")]
+
+    limiter._take(policy, "ip:d", now=100)
+    assert list(limiter.buckets) == [("", "ip:d")]
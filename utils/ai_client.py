@@ -0,0 +1,160 @@
+import asyncio
+import httpx
+from typing import AsyncIterator, List, Optional
+from openai import AsyncOpenAI
+from utils.embedding_cache import EmbeddingCache
+from utils.metrics import span
+from utils.concurrency import run_sync
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHAT_MODEL = "gpt-4"
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"
+
+
+class AIClient:
+    def __init__(self,
+                 api_key: str,
+                 max_connections: int = 20,
+                 max_retries: int = 2,
+                 embedding_concurrency: int = 8,
+                 chat_concurrency: int = 4,
+                 tts_concurrency: int = 4,
+                 embedding_timeout: float = 15,
+                 chat_timeout: float = 120,
+                 tts_timeout: float = 60,
+                 embedding_cache: Optional[EmbeddingCache] = None):
+        """
+        Shared async OpenAI client for embeddings, chat and text-to-speech.
+
+        One HTTP connection pool is reused across requests. Each operation has its
+        own concurrency limit and timeout, so a burst of story requests cannot
+        starve keyword embeddings.
+
+        :param api_key: OpenAI API key
+        :param max_connections: Size of the shared HTTP connection pool
+        :param max_retries: Retries performed by the OpenAI client on transient errors
+        :param embedding_concurrency: Maximum in-flight embedding requests
+        :param chat_concurrency: Maximum in-flight chat completions
+        :param tts_concurrency: Maximum in-flight speech requests
+        :param embedding_timeout: Seconds before an embedding request is abandoned
+        :param chat_timeout: Seconds before a chat completion is abandoned
+        :param tts_timeout: Seconds before a speech request is abandoned
+        :param embedding_cache: Optional cache consulted before calling the embeddings API
+        """
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self._http, max_retries=max_retries)
+        self.embedding_cache = embedding_cache
+        self._limits = {
+            "embeddings": asyncio.Semaphore(embedding_concurrency),
+            "chat": asyncio.Semaphore(chat_concurrency),
+            "tts": asyncio.Semaphore(tts_concurrency)
+        }
+        self._timeouts = {
+            "embeddings": embedding_timeout,
+            "chat": chat_timeout,
+            "tts": tts_timeout
+        }
+
+    async def _call(self, operation: str, factory):
+        async with self._limits[operation]:
+            with span(f"openai.{operation}"):
+                return await asyncio.wait_for(factory(), timeout=self._timeouts[operation])
+
+    async def embed(self, texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+        """
+        Embed several texts, sending only cache misses to the API in a single call.
+
+        :param texts: Input texts
+        :param model: Embedding model name
+        :return: One embedding per input text, in input order
+        """
+        embeddings = [None] * len(texts)
+        if self.embedding_cache is not None:
+            # The cache may read SQLite, so lookups run in the thread pool
+            embeddings = await run_sync(lambda: [self.embedding_cache.get(model, text) for text in texts])
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            response = await self._call(
+                "embeddings",
+                lambda: self.client.embeddings.create(input=[texts[i] for i in missing], model=model)
+            )
+            for i, item in zip(missing, sorted(response.data, key=lambda d: d.index)):
+                embeddings[i] = item.embedding
+            if self.embedding_cache is not None:
+                await run_sync(lambda: [self.embedding_cache.set(model, texts[i], embeddings[i]) for i in missing])
+
+        return embeddings
+
+    async def embed_one(self, text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+        return (await self.embed([text], model=model))[0]
+
+    async def chat(self, messages: List[dict], model: str = CHAT_MODEL, max_tokens: Optional[int] = None) -> str:
+        """
+        Run a chat completion and return the message content.
+
+        :param messages: Chat messages
+        :param model: Chat model name
+        :param max_tokens: Completion token limit
+        :return: The generated text
+        """
+        response = await self._call(
+            "chat",
+            lambda: self.client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens)
+        )
+        return response.choices[0].message.content
+
+    async def chat_stream(self, messages: List[dict], model: str = CHAT_MODEL, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion, yielding text deltas as they arrive.
+
+        The chat concurrency slot is held until the stream is exhausted, and the
+        chat timeout bounds the whole stream rather than each chunk.
+
+        :param messages: Chat messages
+        :param model: Chat model name
+        :param max_tokens: Completion token limit
+        """
+        async with self._limits["chat"]:
+            # The span covers the whole stream, including time the consumer spends between chunks
+            with span("openai.chat_stream"):
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self._timeouts["chat"]
+                stream = await asyncio.wait_for(
+                    self.client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens, stream=True),
+                    timeout=self._timeouts["chat"]
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    # Bound each wait by the time left, so a stalled stream is cut off too
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        await stream.close()
+                        raise asyncio.TimeoutError("Chat stream exceeded its timeout")
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+    async def speech(self, text: str, model: str = TTS_MODEL, voice: str = TTS_VOICE) -> bytes:
+        """
+        Render text to MP3 audio.
+
+        :param text: Text to speak
+        :param model: TTS model name
+        :param voice: Voice name
+        :return: The MP3 bytes
+        """
+        response = await self._call(
+            "tts",
+            lambda: self.client.audio.speech.create(model=model, voice=voice, input=text)
+        )
+        return response.content
+
+    async def close(self):
+        await self.client.close()
+        await self._http.aclose()
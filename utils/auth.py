@@ -1,7 +1,6 @@
 from fastapi.security import HTTPBearer
 from fastapi import Request
-from config.settings import TEST_USER_ID, DB_CONNECTION_STRING, COLLECTION_NAME
-from utils.supabase_vector import SupabaseVectorDB
+from config.settings import TEST_USER_ID
 
 security = HTTPBearer()
 
@@ -11,13 +10,29 @@ async def get_supabase(request: Request):
 async def get_current_user():
     return {"id": TEST_USER_ID}
 
-async def get_supabase_vector_db():
-    db = SupabaseVectorDB(
-        db_connection=DB_CONNECTION_STRING,
-        collection_name=COLLECTION_NAME,
-        dimension=1536
-    )
-    return db
+async def get_supabase_vector_db(request: Request):
+    return request.app.state.vector_db
+
+async def get_keyword_db(request: Request):
+    return request.app.state.keyword_db
+
+async def get_keyword_registry(request: Request):
+    return request.app.state.keyword_registry
+
+async def get_ai_client(request: Request):
+    return request.app.state.ai_client
+
+async def get_job_queue(request: Request):
+    return request.app.state.job_queue
+
+async def get_feed_cache(request: Request):
+    return request.app.state.feed_cache
+
+async def get_blocked_sets(request: Request):
+    return request.app.state.blocked_sets
+
+async def get_channel_catalog(request: Request):
+    return request.app.state.channel_catalog
 
 '''
 from fastapi import Depends, HTTPException, status
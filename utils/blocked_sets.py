@@ -0,0 +1,328 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import numpy as np
+import orjson
+
+
+class FeedCatalog:
+    def __init__(self, rows: List[dict]):
+        """
+        The video catalog in feed order, with every video assigned a bit position.
+
+        :param rows: Feed rows (AllowedVideo fields plus channel_id and created_at)
+                     sorted by created_at desc, video_id desc
+        """
+        self.rows = rows
+        # Identifies the catalog's content, so an unchanged reload can be skipped
+        self.digest = hashlib.sha256(orjson.dumps(rows, default=str)).hexdigest()
+        self.positions: Dict[str, int] = {str(row['video_id']): i for i, row in enumerate(rows)}
+        self.size = len(rows)
+        self.n_bytes = (self.size + 7) // 8
+
+        channel_positions: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            channel_positions.setdefault(str(row['channel_id']), []).append(i)
+        self.channel_bitmaps = {
+            channel_id: self.bitmap(positions)
+            for channel_id, positions in channel_positions.items()
+        }
+
+    def empty_bitmap(self) -> np.ndarray:
+        return np.zeros(self.n_bytes, dtype=np.uint8)
+
+    def bitmap(self, positions: Iterable[int]) -> np.ndarray:
+        bits = np.zeros(self.n_bytes * 8, dtype=np.uint8)
+        bits[np.fromiter(positions, dtype=np.int64)] = 1
+        return np.packbits(bits)
+
+    def video_bitmap(self, video_ids: Iterable[str]) -> np.ndarray:
+        """Bitmap of the given videos; ids not in the catalog are ignored."""
+        return self.bitmap(p for p in (self.positions.get(str(v)) for v in video_ids) if p is not None)
+
+    def video_ids(self, bitmap: np.ndarray) -> List[str]:
+        """Video ids of the bits set in a bitmap of this catalog."""
+        return [str(self.rows[p]['video_id']) for p in np.flatnonzero(np.unpackbits(bitmap)[:self.size])]
+
+    def seek(self, created_at: str, video_id: str) -> int:
+        """Position of the first row after the (created_at, video_id) sort key."""
+        position = self.positions.get(str(video_id))
+        if position is not None:
+            return position + 1
+        # The row left the catalog: binary search on the sort key instead
+        key = (created_at, str(video_id))
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = self.rows[mid]
+            if (str(row['created_at']), str(row['video_id'])) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class _UserBlocks:
+    def __init__(self, catalog: FeedCatalog):
+        self.channels: Set[str] = set()
+        self.keywords: Set[str] = set()
+        self.bitmap = catalog.empty_bitmap()
+
+
+class _KeywordLinks:
+    def __init__(self, links: np.ndarray):
+        # Links are the same for every user, so one bitmap is shared by all users blocking the keyword
+        self.bitmap = links
+        # Linked videos not in the catalog yet; they get their bits when a reloaded catalog has them
+        self.outside: Set[str] = set()
+        self.users: Set[str] = set()
+
+
+class _PendingLoad:
+    def __init__(self):
+        # Block changes made while the user's blocks are read from the database
+        self.changes: List[Callable[[str, Optional[_UserBlocks]], None]] = []
+        self.loaders = 0
+
+
+class BlockedVideoSets:
+    def __init__(self, catalog: FeedCatalog, max_users: int = 10000):
+        """
+        Per-user blocked-video bitmaps over a FeedCatalog.
+
+        Each user keeps the union of their blocked channels and keywords. The
+        bitmaps of channels and keywords themselves are shared: channel bitmaps
+        live in the catalog, and each keyword's bitmap is held once and dropped
+        when the last loaded user blocking it goes away. Blocking ORs one bitmap
+        in; unblocking rebuilds the union from the user's remaining blocks. A
+        feed page is the catalog order minus the user's union bitmap. Users are
+        loaded on first access and evicted least recently used beyond max_users.
+
+        Loading reads the user's blocks from the database between begin_load
+        and load_user. Block changes arriving in that window are recorded and
+        replayed on top of the snapshot, so a change is never lost to, or
+        overwritten by, a snapshot read before it.
+
+        A reloaded catalog is swapped in with rebase, which keeps every loaded
+        user and remaps their bitmaps to the new positions.
+
+        :param catalog: The video catalog in feed order
+        :param max_users: Maximum number of users kept in memory
+        """
+        self.catalog = catalog
+        self.max_users = max_users
+        self._users: "OrderedDict[str, _UserBlocks]" = OrderedDict()
+        self._keywords: Dict[str, _KeywordLinks] = {}
+        self._loading: Dict[str, _PendingLoad] = {}
+        self._lock = threading.RLock()
+
+    def is_loaded(self, user_id: str) -> bool:
+        return str(user_id) in self._users
+
+    def is_tracked(self, user_id: str) -> bool:
+        """Whether block changes for the user are applied: it is loaded or being loaded."""
+        return str(user_id) in self._users or str(user_id) in self._loading
+
+    def begin_load(self, user_id: str):
+        """Start recording the user's block changes; call before reading their blocks."""
+        with self._lock:
+            self._loading.setdefault(str(user_id), _PendingLoad()).loaders += 1
+
+    def abort_load(self, user_id: str):
+        """End a begin_load whose database reads failed."""
+        with self._lock:
+            self._end_load(str(user_id))
+
+    def load_user(self, user_id: str, channel_ids: Iterable[str], keyword_videos: Dict[str, Iterable[str]]):
+        """
+        Materialize a user's blocks, then replay changes recorded since begin_load.
+
+        :param user_id: The user
+        :param channel_ids: Channels the user blocked
+        :param keyword_videos: Keyword id -> video ids linked to it, for each keyword the user blocked
+        """
+        user_id = str(user_id)
+        with self._lock:
+            changes = self._end_load(user_id)
+            self._drop_user(user_id)
+            blocks = _UserBlocks(self.catalog)
+            self._users[user_id] = blocks
+            for channel_id in channel_ids:
+                self._add_channel(blocks, str(channel_id))
+            for keyword_id, video_ids in keyword_videos.items():
+                self._add_keyword(user_id, blocks, str(keyword_id), video_ids)
+            # Each change sets the final state of one block, so replaying changes the
+            # snapshot already reflects is harmless
+            for change in changes:
+                change(user_id, blocks)
+            while len(self._users) > self.max_users:
+                self._drop_user(next(iter(self._users)))
+
+    def block_channel(self, user_id: str, channel_id: str):
+        def change(user_id: str, blocks: Optional[_UserBlocks]):
+            if blocks is not None:
+                self._add_channel(blocks, str(channel_id))
+        self._change(user_id, change)
+
+    def unblock_channel(self, user_id: str, channel_id: str):
+        def change(user_id: str, blocks: Optional[_UserBlocks]):
+            if blocks is not None and str(channel_id) in blocks.channels:
+                blocks.channels.discard(str(channel_id))
+                self._rebuild(blocks)
+        self._change(user_id, change)
+
+    def block_keyword(self, user_id: str, keyword_id: str, video_ids: Iterable[str]):
+        """Add a keyword to a loaded user's blocks and record new links for everyone blocking it."""
+        video_ids = list(video_ids)
+
+        def change(user_id: str, blocks: Optional[_UserBlocks]):
+            if blocks is not None:
+                self._add_keyword(user_id, blocks, str(keyword_id), video_ids)
+            else:
+                self.add_keyword_links(keyword_id, video_ids)
+        self._change(user_id, change)
+
+    def unblock_keyword(self, user_id: str, keyword_id: str):
+        def change(user_id: str, blocks: Optional[_UserBlocks]):
+            if blocks is not None and str(keyword_id) in blocks.keywords:
+                self._remove_keyword(user_id, blocks, str(keyword_id))
+                self._rebuild(blocks)
+        self._change(user_id, change)
+
+    def add_keyword_links(self, keyword_id: str, video_ids: Iterable[str]):
+        """OR newly linked videos into the keyword's shared bitmap and every loaded user that blocks it."""
+        with self._lock:
+            shared = self._keywords.get(str(keyword_id))
+            if shared is None:
+                return
+            video_ids = [str(v) for v in video_ids]
+            shared.outside.update(v for v in video_ids if v not in self.catalog.positions)
+            links = self.catalog.video_bitmap(video_ids)
+            new = links & ~shared.bitmap
+            if not new.any():
+                return
+            np.bitwise_or(shared.bitmap, new, out=shared.bitmap)
+            for user_id in shared.users:
+                np.bitwise_or(self._users[user_id].bitmap, new, out=self._users[user_id].bitmap)
+
+    def rebase(self, catalog: FeedCatalog, new_links: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Swap in a reloaded catalog, keeping every loaded user.
+
+        Keyword bitmaps are remapped by video id: videos that left the catalog
+        drop out, and videos new to it get the links recorded for them earlier
+        or passed in new_links. Users' unions are then rebuilt from the new
+        catalog's channel bitmaps and the remapped keyword bitmaps.
+
+        :param catalog: The reloaded catalog
+        :param new_links: Keyword id -> ids of videos new to the catalog that are linked to it
+        """
+        new_links = new_links or {}
+        with self._lock:
+            for keyword_id, shared in self._keywords.items():
+                video_ids = self.catalog.video_ids(shared.bitmap)
+                video_ids.extend(shared.outside)
+                video_ids.extend(str(v) for v in new_links.get(keyword_id, ()))
+                shared.bitmap = catalog.video_bitmap(video_ids)
+                shared.outside = {v for v in video_ids if v not in catalog.positions}
+            self.catalog = catalog
+            for blocks in self._users.values():
+                self._rebuild(blocks)
+
+    def page(self, user_id: str, limit: int, offset: int = 0, start: int = 0) -> Optional[List[dict]]:
+        """
+        Allowed rows for a loaded user.
+
+        :param user_id: The user
+        :param limit: Maximum number of rows
+        :param offset: Allowed rows to skip (page mode)
+        :param start: Catalog position to start from (cursor mode, see FeedCatalog.seek)
+        :return: The rows, or None if the user is not loaded
+        """
+        with self._lock:
+            blocks = self._get(user_id)
+            if blocks is None:
+                return None
+            blocked = np.unpackbits(blocks.bitmap[start // 8:])[start % 8:]
+            blocked = blocked[:self.catalog.size - start]
+            allowed = np.flatnonzero(blocked == 0)[offset:offset + limit] + start
+            return [self.catalog.rows[i] for i in allowed]
+
+    def stats(self) -> dict:
+        return {
+            "catalog_videos": self.catalog.size,
+            "users": len(self._users),
+            "keywords": len(self._keywords),
+            "memory_bytes": sum(blocks.bitmap.nbytes for blocks in self._users.values())
+            + sum(shared.bitmap.nbytes for shared in self._keywords.values())
+            + sum(b.nbytes for b in self.catalog.channel_bitmaps.values())
+        }
+
+    def _change(self, user_id: str, change: Callable[[str, Optional[_UserBlocks]], None]):
+        """Apply a block change to the user if loaded, and record it for loads in progress."""
+        with self._lock:
+            pending = self._loading.get(str(user_id))
+            if pending is not None:
+                pending.changes.append(change)
+            change(str(user_id), self._get(user_id))
+
+    def _end_load(self, user_id: str) -> list:
+        pending = self._loading.get(user_id)
+        if pending is None:
+            return []
+        pending.loaders -= 1
+        if pending.loaders <= 0:
+            del self._loading[user_id]
+        # Concurrent loads of the same user each replay every change recorded so far
+        return list(pending.changes)
+
+    def _get(self, user_id: str) -> Optional[_UserBlocks]:
+        blocks = self._users.get(str(user_id))
+        if blocks is not None:
+            self._users.move_to_end(str(user_id))
+        return blocks
+
+    def _add_channel(self, blocks: _UserBlocks, channel_id: str):
+        blocks.channels.add(channel_id)
+        channel_bitmap = self.catalog.channel_bitmaps.get(channel_id)
+        if channel_bitmap is not None:
+            np.bitwise_or(blocks.bitmap, channel_bitmap, out=blocks.bitmap)
+
+    def _add_keyword(self, user_id: str, blocks: _UserBlocks, keyword_id: str, video_ids: Iterable[str]):
+        """Reference the keyword's shared bitmap from a user's blocks, creating or extending it with video_ids."""
+        shared = self._keywords.get(keyword_id)
+        if shared is None:
+            video_ids = [str(v) for v in video_ids]
+            shared = self._keywords[keyword_id] = _KeywordLinks(self.catalog.video_bitmap(video_ids))
+            shared.outside.update(v for v in video_ids if v not in self.catalog.positions)
+        else:
+            self.add_keyword_links(keyword_id, video_ids)
+        blocks.keywords.add(keyword_id)
+        shared.users.add(user_id)
+        np.bitwise_or(blocks.bitmap, shared.bitmap, out=blocks.bitmap)
+
+    def _remove_keyword(self, user_id: str, blocks: _UserBlocks, keyword_id: str):
+        blocks.keywords.discard(keyword_id)
+        shared = self._keywords.get(keyword_id)
+        if shared is not None:
+            shared.users.discard(user_id)
+            if not shared.users:
+                del self._keywords[keyword_id]
+
+    def _rebuild(self, blocks: _UserBlocks):
+        bitmap = self.catalog.empty_bitmap()
+        for channel_id in blocks.channels:
+            channel_bitmap = self.catalog.channel_bitmaps.get(channel_id)
+            if channel_bitmap is not None:
+                np.bitwise_or(bitmap, channel_bitmap, out=bitmap)
+        for keyword_id in blocks.keywords:
+            np.bitwise_or(bitmap, self._keywords[keyword_id].bitmap, out=bitmap)
+        blocks.bitmap = bitmap
+
+    def _drop_user(self, user_id: str):
+        blocks = self._users.pop(user_id, None)
+        if blocks is None:
+            return
+        for keyword_id in list(blocks.keywords):
+            self._remove_keyword(user_id, blocks, keyword_id)
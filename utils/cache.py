@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 10000, ttl: float = 60, max_weight: Optional[int] = None):
+        """
+        In-process LRU cache with per-entry expiry and tag-based invalidation.
+
+        :param max_entries: Maximum number of entries kept
+        :param ttl: Seconds an entry stays valid
+        :param max_weight: Optional bound on the summed weight of all entries
+                           (e.g. rows held), evicting least recently used entries first
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value, tags: Iterable[Hashable] = (), weight: int = 1):
+        """
+        Store a value.
+
+        :param key: Cache key
+        :param value: Value to store
+        :param tags: Tags the entry can later be invalidated by
+        :param weight: Cost of the entry counted against max_weight
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags, weight)
+            self._weight += weight
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_weight is not None and self._weight > self.max_weight)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop one entry and return whether it was cached."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry stored with the tag and return how many were dropped."""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._weight = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "weight": self._weight,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, _, tags, weight = entry
+        self._weight -= weight
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
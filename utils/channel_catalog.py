@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Iterable, List
+
+
+class ChannelCatalog:
+    def __init__(self, loader: Callable[[], Awaitable[List[dict]]], ttl: float = 300):
+        """
+        In-process copy of the channels table behind a version number.
+
+        The table is reloaded at most once per ttl seconds. The version only
+        changes when the reloaded rows differ, so ETags derived from the content
+        digest stay valid across reloads and across workers.
+
+        :param loader: Coroutine function returning every channel row, in a stable order
+        :param ttl: Seconds before the table is reloaded
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self.version = 0
+        self.digest = ""
+        self._channels: List[dict] = []
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> List[dict]:
+        """Return the channel rows, reloading them if stale. Concurrent callers share one reload."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._channels
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                await self._reload()
+            return self._channels
+
+    def invalidate(self):
+        """Force a reload on the next get()."""
+        self._loaded_at = None
+
+    def etag(self, blocked_channel_ids: Iterable[str]) -> str:
+        """
+        Weak ETag for one user's view of the catalog.
+
+        :param blocked_channel_ids: Channels the user has blocked
+        """
+        blocked = ",".join(sorted(str(channel_id) for channel_id in blocked_channel_ids))
+        user_digest = hashlib.sha1(blocked.encode("utf-8")).hexdigest()[:12]
+        return f'W/"{self.digest[:16]}-{user_digest}"'
+
+    async def _reload(self):
+        channels = await self._loader()
+        digest = hashlib.sha1(json.dumps(channels, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        if digest != self.digest:
+            self.version += 1
+            self.digest = digest
+            self._channels = channels
+        self._loaded_at = time.monotonic()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
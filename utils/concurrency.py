@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure(max_workers: int):
+    """
+    Size the thread pool used by run_sync. Call once at startup.
+
+    The pool bounds how many blocking calls (vecs queries, SQLite) run at
+    once; callers beyond that wait for a free thread instead of piling up.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync")
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_sync(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking function in the bounded thread pool without blocking the event loop.
+
+    The caller's contextvars (such as the current request's timing spans) are
+    visible inside the function.
+    """
+    if _executor is None:
+        configure(8)
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from utils.text import normalize_text
+from config.logger import logger
+
+
+class EmbeddingCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        """
+        Two-tier cache for text embeddings.
+
+        Lookups hit an in-memory LRU first and fall back to a SQLite file, so
+        embeddings survive restarts. Entries are keyed by model and normalized text.
+
+        :param path: SQLite file for the persistent tier (None keeps the cache memory-only)
+        :param max_entries: Maximum number of embeddings held in memory
+        """
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "create table if not exists embeddings (key text primary key, model text not null, vector blob not null)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up an embedding.
+
+        :param model: Embedding model name
+        :param text: Input text (normalized before lookup)
+        :return: The cached embedding, or None on a miss
+        """
+        key = self.make_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute("select vector from embeddings where key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def set(self, model: str, text: str, vector: List[float]):
+        """
+        Store an embedding in both tiers.
+
+        :param model: Embedding model name
+        :param text: Input text (normalized before storing)
+        :param vector: The embedding vector
+        """
+        key = self.make_key(model, text)
+        with self._lock:
+            self._remember(key, list(vector))
+            if self._db is not None:
+                self._db.execute(
+                    "insert or replace into embeddings (key, model, vector) values (?, ?, ?)",
+                    (key, model, np.asarray(vector, dtype=np.float32).tobytes())
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and the current memory tier size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        logger.info(f"Embedding cache closed: {self.stats()}")
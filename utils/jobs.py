@@ -0,0 +1,149 @@
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from config.logger import logger
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    def __init__(self, kind: str, owner: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.owner = owner
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def set_stage(self, stage: str, progress: float):
+        self.stage = stage
+        self.progress = progress
+        self.updated_at = time.time()
+
+    def finish(self, result=None, error: Optional[str] = None):
+        self.status = "failed" if error else "succeeded"
+        self.stage = self.status
+        self.progress = 1.0
+        self.result = result
+        self.error = error
+        self.updated_at = time.time()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class InMemoryJobBackend:
+    def __init__(self, max_queue_size: int = 100, result_ttl: int = 3600):
+        """
+        Process-local job storage: a bounded asyncio queue plus a job table.
+
+        Jobs are lost on restart, which is acceptable for local development and
+        single-instance deployments.
+
+        :param max_queue_size: Jobs allowed to wait before submissions are rejected
+        :param result_ttl: Seconds a finished job stays queryable
+        """
+        self.result_ttl = result_ttl
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+        self._jobs: Dict[str, Job] = {}
+
+    def put(self, job: Job, payload):
+        self._prune()
+        try:
+            self._queue.put_nowait((job, payload))
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+        self._jobs[job.id] = job
+
+    async def get(self) -> Tuple[Job, object]:
+        return await self._queue.get()
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class JobQueue:
+    def __init__(self, backend: InMemoryJobBackend, workers: int = 2):
+        """
+        Bounded worker pool that runs registered job handlers.
+
+        :param backend: Storage for queued and finished jobs
+        :param workers: Number of jobs run concurrently
+        """
+        self.backend = backend
+        self.workers = workers
+        self._handlers: Dict[str, Callable[[Job, object], Awaitable[object]]] = {}
+        self._tasks = []
+
+    def register(self, kind: str, handler: Callable[[Job, object], Awaitable[object]]):
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload, owner: Optional[str] = None) -> Job:
+        """
+        Queue a job without waiting for it to run.
+
+        :raises QueueFullError: If the queue is at capacity
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job = Job(kind, owner=owner)
+        self.backend.put(job, payload)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.backend.get_job(job_id)
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Job queue stopped ({self.backend.pending()} jobs abandoned)")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job, payload = await self.backend.get()
+            job.status = "running"
+            try:
+                result = await self._handlers[job.kind](job, payload)
+                job.finish(result=result)
+                logger.info(f"Job {job.id} ({job.kind}) finished on worker {worker_id}")
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                job.finish(error=getattr(e, "detail", None) or "Job failed")
+            finally:
+                self.backend.task_done()
@@ -0,0 +1,182 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config.logger import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans recorded while handling the current request, as (name, seconds) pairs
+_request_spans: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "reo"):
+        """
+        Process-local latency histograms and gauges rendered in Prometheus text format.
+
+        :param prefix: Prefix for every exported metric name
+        """
+        self.prefix = prefix
+        self._requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self._spans: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, str(status))
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_span(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._spans.get(name)
+            if histogram is None:
+                histogram = self._spans[name] = Histogram()
+            histogram.observe(seconds)
+
+    def register_gauges(self, name: str, collect: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+        """
+        Add a callback polled at scrape time, replacing any callback with the same name.
+
+        :param name: Name of the gauge source
+        :param collect: Returns (metric name, labels, value) triples
+        """
+        self._gauges[name] = collect
+
+    def span_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Call count and total seconds of every span recorded so far."""
+        with self._lock:
+            return {name: (h.count, h.sum) for name, h in self._spans.items()}
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            requests = [(dict(method=m, route=r, status=s), h) for (m, r, s), h in sorted(self._requests.items())]
+            spans = [(dict(span=name), h) for name, h in sorted(self._spans.items())]
+            self._render_histograms(lines, "request_duration_seconds", "HTTP request latency by route", requests)
+            self._render_histograms(lines, "span_duration_seconds", "Latency of external calls and serialization", spans)
+
+        for collect in list(self._gauges.values()):
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.error(f"Error collecting gauges: {str(e)}")
+                continue
+            for name, labels, value in samples:
+                lines.append(f"{self.prefix}_{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histograms(self, lines: List[str], name: str, description: str, series):
+        metric = f"{self.prefix}_{name}"
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels({**labels, 'le': repr(bound)})} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def stats_samples(metric: str, labels: Dict[str, str], stats: Optional[dict]):
+    """Turn a component's stats() dict into gauge samples, skipping non-numeric values."""
+    for key, value in (stats or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{metric}_{key}", labels, value
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block, record it in the span histogram and in the current request's breakdown.
+
+    Works around awaits in async code; contextvars carry the request's span
+    list into tasks and threads started from it.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe_span(name, elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+class MetricsMiddleware:
+    def __init__(self, app, slow_request_threshold: Optional[float] = None):
+        """
+        Pure ASGI middleware recording per-route latency histograms.
+
+        :param app: The ASGI app
+        :param slow_request_threshold: Seconds above which a request is logged
+                                       with its span breakdown (None disables)
+        """
+        self.app = app
+        self.slow_request_threshold = slow_request_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = _request_spans.set(spans)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_spans.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            registry.observe_request(scope["method"], route_path, status, elapsed)
+
+            if self.slow_request_threshold is not None and elapsed >= self.slow_request_threshold:
+                breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in spans) or "no spans"
+                logger.warning(
+                    f"Slow request {scope['method']} {route_path} -> {status} "
+                    f"in {elapsed * 1000:.1f}ms ({breakdown})"
+                )
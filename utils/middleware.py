@@ -1,37 +1,118 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
+import hashlib
+import math
 import time
+from collections import OrderedDict
+from typing import List, Optional
+from starlette.responses import JSONResponse
 from config.logger import logger
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+
+class RateLimitPolicy:
+    def __init__(self, path_prefix: str, max_requests: int, duration: int, per: str = "ip"):
+        """
+        A token bucket applied to every request whose path starts with path_prefix.
+
+        :param path_prefix: Path prefix the policy applies to ('' matches everything)
+        :param max_requests: Bucket capacity, i.e. requests allowed per duration
+        :param duration: Seconds needed to refill an empty bucket
+        :param per: 'ip' to limit per client address, 'user' to limit per bearer token
+                    (requests without a token fall back to the client address)
+        """
+        if per not in ("ip", "user"):
+            raise ValueError(f"Unsupported rate limit key: {per}")
+        self.path_prefix = path_prefix
+        self.max_requests = max_requests
+        self.duration = duration
+        self.per = per
+        self.refill_rate = max_requests / duration
+
+
+class RateLimitMiddleware:
     def __init__(
-        self, 
+        self,
         app,
         rate_limit_duration: int = 60,  # Duration in seconds
         max_requests: int = 5,  # Max requests per duration
-        include_paths: list = None  # List of paths to apply rate limiting
+        include_paths: list = None,  # List of paths to apply rate limiting
+        policies: Optional[List[RateLimitPolicy]] = None,  # Overrides the three arguments above
+        max_keys: int = 100000  # Upper bound on tracked clients
     ):
-        super().__init__(app)
-        self.rate_limit_duration = rate_limit_duration
-        self.max_requests = max_requests
-        self.include_paths = include_paths or []
-        self.request_counts = defaultdict(list)
+        """
+        Pure ASGI token-bucket rate limiter.
+
+        Each (policy, client) pair has one bucket holding a token count and the
+        time it was last refilled, so checking a request is O(1). Buckets are kept
+        in least-recently-used order; buckets idle long enough to have refilled
+        completely carry no state and are evicted from the front.
+        """
+        self.app = app
+        if policies is None:
+            policies = [
+                RateLimitPolicy(path, max_requests, rate_limit_duration)
+                for path in (include_paths or [""])
+            ]
+        # Longest prefix wins when several policies match
+        self.policies = sorted(policies, key=lambda p: len(p.path_prefix), reverse=True)
+        self.max_keys = max_keys
+        self.idle_ttl = max(p.duration for p in self.policies) if self.policies else 0
+        self.buckets = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        policy = next((p for p in self.policies if path.startswith(p.path_prefix)), None)
+        if policy is not None:
+            client_key = self._client_key(scope, policy)
+            retry_after = self._take(policy, client_key, time.monotonic())
+            if retry_after is not None:
+                logger.warning(f"Rate limit exceeded for {client_key} on path {path}")
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Rate limit exceeded"},
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        if not self.include_paths or any(path.startswith(p) for p in self.include_paths):
-            client_ip = request.client.host
-            current_time = time.time()
+    def _take(self, policy: RateLimitPolicy, client_key: str, now: float) -> Optional[float]:
+        """
+        Spend one token from the client's bucket.
 
-            # Remove old timestamps
-            self.request_counts[client_ip] = [ts for ts in self.request_counts[client_ip] if current_time - ts < self.rate_limit_duration]
+        :return: None if the request is allowed, otherwise seconds until a token is available
+        """
+        key = (policy.path_prefix, client_key)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [float(policy.max_requests), now]
+            self.buckets[key] = bucket
+            self._evict(now)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(policy.max_requests, bucket[0] + (now - bucket[1]) * policy.refill_rate)
+            bucket[1] = now
 
-            if len(self.request_counts[client_ip]) >= self.max_requests:
-                logger.warning(f"Rate limit exceeded for IP {client_ip} on path {path}")
-                raise HTTPException(status_code=429, detail="Rate limit exceeded")
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return None
+        return (1 - bucket[0]) / policy.refill_rate
 
-            self.request_counts[client_ip].append(current_time)
+    def _evict(self, now: float):
+        while self.buckets:
+            _, (_, last_seen) = next(iter(self.buckets.items()))
+            if len(self.buckets) <= self.max_keys and now - last_seen < self.idle_ttl:
+                break
+            self.buckets.popitem(last=False)
 
-        response = await call_next(request)
-        return response
\ No newline at end of file
+    @staticmethod
+    def _client_key(scope, policy: RateLimitPolicy) -> str:
+        if policy.per == "user":
+            for name, value in scope.get("headers", []):
+                if name == b"authorization":
+                    return "user:" + hashlib.sha256(value).hexdigest()[:32]
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(created_at: str, video_id: str) -> str:
+    """
+    Build an opaque feed cursor from the sort key of the last row on a page.
+
+    :param created_at: ISO timestamp of the row
+    :param video_id: Id of the row, the tie-breaker for equal timestamps
+    :return: URL-safe cursor string
+    """
+    raw = json.dumps([created_at, video_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+    """
+    Read a cursor produced by encode_cursor.
+
+    :param cursor: Cursor string; an empty string means the start of the feed
+    :return: (created_at, video_id), or None for the start of the feed
+    :raises ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, video_id = json.loads(raw)
+        datetime.fromisoformat(created_at)
+        return str(created_at), str(video_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,60 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Type, get_args
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import JSONResponse, Response
+from config.settings import FAST_RESPONSES
+from utils.metrics import span
+
+# Routes return FastJSONResponse directly when this is on, skipping response_model
+# validation and the stdlib JSON encoder
+FAST_RESPONSES_ENABLED = FAST_RESPONSES.lower() == "true"
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with span("serialize.orjson"):
+            # OPT_UTC_Z writes UTC as "Z", the way pydantic serializes datetimes
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+
+
+class TimedJSONResponse(JSONResponse):
+    """The default JSONResponse with its encoding time recorded as a span."""
+
+    def render(self, content) -> bytes:
+        with span("serialize.json"):
+            return super().render(content)
+
+
+@lru_cache(maxsize=None)
+def _datetime_fields(model: Type[BaseModel]) -> Dict[str, TypeAdapter]:
+    return {
+        name: TypeAdapter(field.annotation)
+        for name, field in model.model_fields.items()
+        if field.annotation is datetime or datetime in get_args(field.annotation)
+    }
+
+
+def project_rows(rows: Iterable[dict], model: Type[BaseModel]) -> List[dict]:
+    """
+    Trim trusted database rows to a model's fields without validating them.
+
+    Only datetime fields are parsed, since PostgREST's timestamp strings
+    ("2024-07-21T10:00:00.12345+00:00") differ from the model's JSON output
+    ("2024-07-21T10:00:00.123450Z").
+
+    :param rows: Rows returned by PostgREST or an RPC
+    :param model: Response model whose fields are kept
+    :return: Plain dicts ready for FastJSONResponse
+    """
+    fields = tuple(model.model_fields)
+    datetime_fields = _datetime_fields(model)
+    projected = [{field: row.get(field) for field in fields} for row in rows]
+    if datetime_fields:
+        for row in projected:
+            for field, adapter in datetime_fields.items():
+                row[field] = adapter.validate_python(row[field])
+    return projected
@@ -1,50 +1,259 @@
+import asyncio
 import vecs
-from typing import List, Dict, Union, Optional
+from itertools import islice
+from typing import Iterable, List, Dict, Union, Optional
 import numpy as np
+from sqlalchemy import create_engine, text, select
+from sqlalchemy.orm import sessionmaker
+from utils.vector_index import LocalVectorIndex
+from utils.metrics import span
+from utils.concurrency import run_sync
+from config.logger import logger
+
+# pgvector operators matching the vecs distance measures
+DISTANCE_OPERATORS = {
+    "cosine_distance": "<=>",
+    "l2_distance": "<->",
+    "max_inner_product": "<#>"
+}
+
+
+def _vector_literal(vector: Union[List[float], np.ndarray]) -> str:
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+def _set_search_params(sess, probes: Optional[int], ef_search: Optional[int]):
+    """Apply per-query index settings to the session's current transaction."""
+    # set local does not take bind parameters; int() keeps the values literal numbers
+    if probes is not None:
+        sess.execute(text(f"set local ivfflat.probes = {int(probes)}"))
+    if ef_search is not None:
+        sess.execute(text(f"set local hnsw.ef_search = {int(ef_search)}"))
+
+
+async def refresh_local_index_periodically(db: "SupabaseVectorDB", interval: float):
+    """
+    Pick up vectors written by other processes (the ingestion CLI, other workers)
+    every interval seconds; see SupabaseVectorDB.refresh_local_index.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changes = await run_sync(db.refresh_local_index)
+            if changes["added"] or changes["removed"]:
+                logger.info(f"Local index refreshed: {changes['added']} added, {changes['removed']} removed")
+        except Exception as e:
+            logger.error(f"Error refreshing local index: {str(e)}")
+
 
 class SupabaseVectorDB:
-    def __init__(self, db_connection: str, collection_name: str, dimension: int = 1536):
+    def __init__(self,
+                 db_connection: str,
+                 collection_name: str,
+                 dimension: int = 1536,
+                 pool_size: int = 5,
+                 max_overflow: int = 10,
+                 pool_timeout: int = 30,
+                 pool_recycle: int = 1800):
         """
         Initialize the SupabaseVectorDB client.
+
+        The client is meant to be created once and shared: it owns a pooled
+        SQLAlchemy engine, so queries borrow a connection instead of opening one.
         
         :param db_connection: PostgreSQL connection string
         :param collection_name: Name of the vector collection
         :param dimension: Dimension of the vectors (default is 1536 for OpenAI embeddings)
+        :param pool_size: Number of connections kept open in the pool
+        :param max_overflow: Extra connections allowed above pool_size under burst load
+        :param pool_timeout: Seconds to wait for a free connection before failing
+        :param pool_recycle: Seconds after which a pooled connection is replaced
         """
+        self._closed = False
+        self.dimension = dimension
+        self.local_index: Optional[LocalVectorIndex] = None
         try:
             self.client = vecs.create_client(db_connection)
+            self._configure_pool(db_connection, pool_size, max_overflow, pool_timeout, pool_recycle)
             self.collection = self.client.get_or_create_collection(name=collection_name, dimension=dimension)
-            print(f"Successfully connected to collection: {collection_name}")
+            logger.info(f"Successfully connected to collection: {collection_name}")
         except Exception as e:
             raise ConnectionError(f"Failed to connect to Supabase: {str(e)}")
 
 
-    def create_index(self, method: str = "auto", measure: str = "cosine_distance"):
+    def _configure_pool(self, db_connection: str, pool_size: int, max_overflow: int, pool_timeout: int, pool_recycle: int):
+        """
+        Replace the default vecs engine with one using explicit pool settings.
+
+        vecs does not accept engine options, so the engine it builds is disposed
+        and swapped for a pooled one. pool_pre_ping discards dead connections
+        before they are handed to a query.
+        """
+        self.client.engine.dispose()
+        self.client.engine = create_engine(
+            db_connection,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True
+        )
+        self.client.Session = sessionmaker(self.client.engine)
+
+
+    def health_check(self) -> bool:
+        """
+        Check that a pooled connection can reach the database.
+
+        :return: True if a trivial query succeeds, False otherwise
+        """
+        if self._closed:
+            return False
+        try:
+            with self.client.Session() as sess:
+                sess.execute(text("select 1"))
+            return True
+        except Exception:
+            return False
+
+
+    def pool_status(self) -> str:
+        """Return a short description of the connection pool state."""
+        return self.client.engine.pool.status()
+
+
+    def enable_local_index(self, mode: str = "exact", n_lists: Optional[int] = None, n_probe: int = 8, chunk_size: int = 5000):
+        """
+        Load the collection into an in-process index and serve unfiltered queries from it.
+
+        Postgres stays the source of truth: add_vectors and delete_vectors write
+        to the collection first and then apply the same change to the local index.
+
+        :param mode: 'exact' or 'approximate' (IVF) search
+        :param n_lists: Number of IVF lists for approximate mode
+        :param n_probe: Number of IVF lists scanned per query in approximate mode
+        :param chunk_size: Number of rows fetched per round trip while loading
+        """
+        index = LocalVectorIndex(self.dimension, mode=mode, n_lists=n_lists, n_probe=n_probe)
+        try:
+            index.load(self._iter_collection(chunk_size))
+        except Exception as e:
+            raise RuntimeError(f"Failed to load local index: {str(e)}")
+        self.local_index = index
+        stats = index.stats()
+        logger.info(f"Loaded {stats['vectors']} vectors into local {mode} index ({stats['memory_bytes'] / 1e6:.1f} MB)")
+
+
+    def refresh_local_index(self, chunk_size: int = 5000) -> dict:
+        """
+        Bring the local index up to date with rows written by other processes.
+
+        The collection's ids are compared with the index: rows missing locally
+        are fetched and added, and ids no longer in the collection are dropped.
+        A vector rewritten in place under an existing id is not detected.
+
+        :param chunk_size: Number of rows fetched per round trip
+        :return: Counts of added and removed vectors
+        """
+        if self.local_index is None:
+            return {"added": 0, "removed": 0}
+        # Snapshot local ids first: rows this process writes meanwhile land in
+        # Postgres before the index, so they are never mistaken for deletions
+        local = self.local_index.ids()
+        table = self.collection.table
+        try:
+            with span("vecs.refresh_ids"), self.client.Session() as sess:
+                remote = {row[0] for row in sess.execute(select(table.c.id))}
+            missing = list(remote - local)
+            for i in range(0, len(missing), chunk_size):
+                stmt = select(table.c.id, table.c.vec, table.c.metadata).where(table.c.id.in_(missing[i:i + chunk_size]))
+                with self.client.Session() as sess:
+                    rows = sess.execute(stmt).fetchall()
+                self.local_index.upsert((row[0], row[1], row[2]) for row in rows)
+        except Exception as e:
+            raise RuntimeError(f"Failed to refresh local index: {str(e)}")
+        removed = self.local_index.delete(local - remote) if local - remote else 0
+        return {"added": len(missing), "removed": removed}
+
+
+    def _iter_collection(self, chunk_size: int):
+        """Yield (id, vector, metadata) for every record, paging by id."""
+        table = self.collection.table
+        last_id = None
+        while True:
+            stmt = select(table.c.id, table.c.vec, table.c.metadata).order_by(table.c.id).limit(chunk_size)
+            if last_id is not None:
+                stmt = stmt.where(table.c.id > last_id)
+            with self.client.Session() as sess:
+                rows = sess.execute(stmt).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], row[1], row[2]
+            last_id = rows[-1][0]
+
+
+    def create_index(self,
+                     method: str = "auto",
+                     measure: str = "cosine_distance",
+                     m: Optional[int] = None,
+                     ef_construction: Optional[int] = None,
+                     n_lists: Optional[int] = None,
+                     replace: bool = True):
         """
         Create an index for the collection.
+
+        Build parameters left as None use the vecs defaults. Larger m and
+        ef_construction (HNSW) or a better-fitted n_lists (IVFFlat) raise the
+        recall reachable at a given ef_search or probes, at a higher build cost.
         
         :param method: Indexing method ('auto', 'hnsw', or 'ivfflat')
         :param measure: Distance measure for the index
+        :param m: HNSW: links per node
+        :param ef_construction: HNSW: candidate list size while building
+        :param n_lists: IVFFlat: number of inverted lists
+        :param replace: Drop an existing index on the collection first
         """
+        index_arguments = None
+        if method == "hnsw" and (m is not None or ef_construction is not None):
+            index_arguments = vecs.IndexArgsHNSW(
+                m=m if m is not None else 16,
+                ef_construction=ef_construction if ef_construction is not None else 64
+            )
+        elif method == "ivfflat" and n_lists is not None:
+            index_arguments = vecs.IndexArgsIVFFlat(n_lists=n_lists)
+        elif m is not None or ef_construction is not None or n_lists is not None:
+            raise ValueError(f"Build parameters do not apply to index method: {method}")
         try:
-            self.collection.create_index(method=method, measure=measure)
-            print(f"Successfully created index with method: {method} and measure: {measure}")
+            self.collection.create_index(method=method, measure=measure, index_arguments=index_arguments, replace=replace)
+            logger.debug(f"Successfully created index with method: {method} and measure: {measure}")
         except Exception as e:
             raise RuntimeError(f"Failed to create index: {str(e)}")
         
 
-    def add_vectors(self, records: List[tuple], batch_size: int = 1000):
+    def add_vectors(self, records: Iterable[tuple], batch_size: int = 1000) -> int:
         """
         Add vectors to the collection.
         
-        :param records: List of tuples (id, vector, metadata)
+        :param records: Iterable of tuples (id, vector, metadata), consumed lazily
+                        batch_size records at a time
         :param batch_size: Number of records to upsert in each batch
+        :return: Number of records added
         """
+        added = 0
+        records = iter(records)
         try:
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i+batch_size]
-                self.collection.upsert(records=batch)
-            print(f"Successfully added {len(records)} vectors to the collection.")
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                with span("vecs.upsert"):
+                    self.collection.upsert(records=batch)
+                if self.local_index is not None:
+                    self.local_index.upsert(batch)
+                added += len(batch)
+            logger.debug(f"Successfully added {added} vectors to the collection.")
+            return added
         except Exception as e:
             raise RuntimeError(f"Failed to add vectors: {str(e)}")
 
@@ -55,7 +264,9 @@ class SupabaseVectorDB:
                       filters: Optional[Dict] = None,
                       measure: str = "cosine_distance",
                       include_value: bool = True,
-                      include_metadata: bool = True) -> List[Dict]:
+                      include_metadata: bool = True,
+                      probes: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> List[Dict]:
         """
         Query vectors from the collection.
         
@@ -65,17 +276,208 @@ class SupabaseVectorDB:
         :param measure: Distance measure to use
         :param include_value: Include distance values in results
         :param include_metadata: Include metadata in results
+        :param probes: IVFFlat lists scanned (also used by an approximate local index)
+        :param ef_search: HNSW candidate list size; must be at least limit
         :return: List of query results
         """
+        if self.local_index is not None and not filters:
+            with span("local_index.query"):
+                return self.local_index.query(
+                    query_vector,
+                    limit=limit,
+                    measure=measure,
+                    include_value=include_value,
+                    include_metadata=include_metadata,
+                    n_probe=probes
+                )
         try:
-            results = self.collection.query(
-                data=query_vector,
-                limit=limit,
-                filters=filters or {},
-                measure=measure,
-                include_value=include_value,
-                include_metadata=include_metadata
-            )
+            with span("vecs.query"):
+                results = self.collection.query(
+                    data=query_vector,
+                    limit=limit,
+                    filters=filters or {},
+                    measure=measure,
+                    include_value=include_value,
+                    include_metadata=include_metadata,
+                    probes=probes,
+                    ef_search=ef_search
+                )
+            return results
+        except Exception as e:
+            raise RuntimeError(f"Failed to query vectors: {str(e)}")
+
+
+    def query_radius(self,
+                     query_vector: Union[List[float], np.ndarray],
+                     radius: float,
+                     measure: str = "cosine_distance",
+                     max_results: int = 10000,
+                     page_size: int = 500,
+                     probes: Optional[int] = None,
+                     ef_search: Optional[int] = None) -> List[tuple]:
+        """
+        Return every vector within a distance radius of the query, nearest first.
+
+        The radius is applied in the WHERE clause, so rows outside it never
+        leave the database. Matches are read from a server-side cursor one page
+        at a time, and at most max_results of the nearest are returned.
+
+        With an HNSW index, Postgres may answer from the index, which yields
+        at most ef_search candidates. Pass an ef_search of at least max_results
+        when the radius may cover more rows than that.
+
+        :param query_vector: The query vector
+        :param radius: Maximum distance (inclusive), in the units of measure
+        :param measure: Distance measure to use
+        :param max_results: Hard cap on the number of matches returned
+        :param page_size: Rows fetched per round trip
+        :param probes: IVFFlat lists scanned (also used by an approximate local index)
+        :param ef_search: HNSW candidate list size
+        :return: List of (id, distance) tuples ordered by distance, then id
+        """
+        if self.local_index is not None:
+            with span("local_index.query_radius"):
+                return self.local_index.query_radius(
+                    query_vector, radius, measure=measure, max_results=max_results, n_probe=probes
+                )
+        try:
+            operator = DISTANCE_OPERATORS[measure]
+        except KeyError:
+            raise ValueError(f"Unsupported measure: {measure}")
+
+        table = f'vecs."{self.collection.name}"'
+        stmt = text(f"""
+            select t.id, t.vec {operator} cast(:vec as vector) as distance
+            from {table} t
+            where t.vec {operator} cast(:vec as vector) <= :radius
+            order by distance, t.id
+            limit :max_results
+        """)
+        params = {"vec": _vector_literal(query_vector), "radius": radius, "max_results": max_results}
+
+        try:
+            results = []
+            with span("vecs.query_radius"), self.client.Session() as sess:
+                _set_search_params(sess, probes, ef_search)
+                rows = sess.execute(stmt, params, execution_options={"stream_results": True})
+                for page in rows.partitions(page_size):
+                    results.extend((id_, distance) for id_, distance in page)
+            return results
+        except Exception as e:
+            raise RuntimeError(f"Failed to query vectors: {str(e)}")
+
+
+    def query_radius_batch(self,
+                           query_vectors: List[Union[List[float], np.ndarray]],
+                           radius: float,
+                           measure: str = "cosine_distance",
+                           max_results: int = 1000,
+                           probes: Optional[int] = None,
+                           ef_search: Optional[int] = None) -> List[List[tuple]]:
+        """
+        Run one range search per query vector in a single SQL statement.
+
+        With a local index the batch is scored exactly in one matrix product
+        instead. As with query_radius, pass an ef_search of at least max_results
+        when the collection has an HNSW index.
+
+        :param query_vectors: The query vectors
+        :param radius: Maximum distance (inclusive), in the units of measure
+        :param measure: Distance measure to use
+        :param max_results: Hard cap on the number of matches per query vector
+        :param probes: IVFFlat lists scanned
+        :param ef_search: HNSW candidate list size
+        :return: One list of (id, distance) tuples per query vector, in input order, nearest first
+        """
+        if not query_vectors:
+            return []
+        if self.local_index is not None:
+            with span("local_index.query_radius_batch"):
+                return self.local_index.query_radius_batch(query_vectors, radius, measure=measure, max_results=max_results)
+        try:
+            operator = DISTANCE_OPERATORS[measure]
+        except KeyError:
+            raise ValueError(f"Unsupported measure: {measure}")
+
+        table = f'vecs."{self.collection.name}"'
+        stmt = text(f"""
+            select q.ord, m.id, m.distance
+            from unnest(cast(:vecs as text[])) with ordinality as q(vec, ord)
+            cross join lateral (
+                select t.id, t.vec {operator} cast(q.vec as vector) as distance
+                from {table} t
+                where t.vec {operator} cast(q.vec as vector) <= :radius
+                order by distance, t.id
+                limit :max_results
+            ) m
+            order by q.ord, m.distance, m.id
+        """)
+        params = {
+            "vecs": [_vector_literal(vector) for vector in query_vectors],
+            "radius": radius,
+            "max_results": max_results
+        }
+
+        try:
+            results = [[] for _ in query_vectors]
+            with span("vecs.query_radius_batch"), self.client.Session() as sess:
+                _set_search_params(sess, probes, ef_search)
+                for ord_, id_, distance in sess.execute(stmt, params):
+                    results[ord_ - 1].append((id_, distance))
+            return results
+        except Exception as e:
+            raise RuntimeError(f"Failed to query vectors: {str(e)}")
+
+
+    def query_vectors_batch(self,
+                            query_vectors: List[Union[List[float], np.ndarray]],
+                            limit: int = 5,
+                            measure: str = "cosine_distance",
+                            probes: Optional[int] = None,
+                            ef_search: Optional[int] = None) -> List[List[tuple]]:
+        """
+        Run one nearest-neighbour search per query vector in a single SQL statement.
+
+        :param query_vectors: The query vectors
+        :param limit: Number of results to return per query vector
+        :param measure: Distance measure to use
+        :param probes: IVFFlat lists scanned (also used by an approximate local index)
+        :param ef_search: HNSW candidate list size; must be at least limit
+        :return: One list of (id, distance) tuples per query vector, in input order
+        """
+        if not query_vectors:
+            return []
+        if self.local_index is not None:
+            with span("local_index.query_batch"):
+                return self.local_index.query_batch(query_vectors, limit=limit, measure=measure, n_probe=probes)
+        try:
+            operator = DISTANCE_OPERATORS[measure]
+        except KeyError:
+            raise ValueError(f"Unsupported measure: {measure}")
+
+        table = f'vecs."{self.collection.name}"'
+        stmt = text(f"""
+            select q.ord, m.id, m.distance
+            from unnest(cast(:vecs as text[])) with ordinality as q(vec, ord)
+            cross join lateral (
+                select t.id, t.vec {operator} cast(q.vec as vector) as distance
+                from {table} t
+                order by t.vec {operator} cast(q.vec as vector)
+                limit :limit
+            ) m
+            order by q.ord, m.distance
+        """)
+        params = {
+            "vecs": [_vector_literal(vector) for vector in query_vectors],
+            "limit": limit
+        }
+
+        try:
+            results = [[] for _ in query_vectors]
+            with span("vecs.query_batch"), self.client.Session() as sess:
+                _set_search_params(sess, probes, ef_search)
+                for ord_, id_, distance in sess.execute(stmt, params):
+                    results[ord_ - 1].append((id_, distance))
             return results
         except Exception as e:
             raise RuntimeError(f"Failed to query vectors: {str(e)}")
@@ -89,21 +491,30 @@ class SupabaseVectorDB:
         :param filters: Metadata filters for deletion
         """
         try:
-            if ids:
-                deleted = self.collection.delete(ids=ids)
-            elif filters:
-                deleted = self.collection.delete(filters=filters)
-            else:
+            if not ids and not filters:
                 raise ValueError("Either 'ids' or 'filters' must be provided for deletion.")
-            print(f"Successfully deleted {len(deleted)} vectors from the collection.")
+            with span("vecs.delete"):
+                if ids:
+                    deleted = self.collection.delete(ids=ids)
+                else:
+                    deleted = self.collection.delete(filters=filters)
+            if self.local_index is not None:
+                self.local_index.delete(deleted)
+            logger.debug(f"Successfully deleted {len(deleted)} vectors from the collection.")
         except Exception as e:
             raise RuntimeError(f"Failed to delete vectors: {str(e)}")
 
+    def close(self):
+        """Dispose of the connection pool. Safe to call more than once."""
+        if getattr(self, '_closed', True) or not hasattr(self, 'client'):
+            return
+        self._closed = True
+        self.client.disconnect()
+        logger.debug("Disconnected from Supabase.")
+
     def __del__(self):
         """Cleanup method to disconnect the client when the object is destroyed."""
-        if hasattr(self, 'client'):
-            self.client.disconnect()
-            print("Disconnected from Supabase.")
+        self.close()
 
 
 '''
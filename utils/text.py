@@ -0,0 +1,13 @@
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize free text for use as a lookup key.
+
+    :param text: Raw text as entered by the user
+    :return: Lowercased text with surrounding whitespace stripped and inner runs collapsed
+    """
+    return _WHITESPACE.sub(" ", text).strip().lower()
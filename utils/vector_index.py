@@ -0,0 +1,330 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Union
+import numpy as np
+
+MEASURES = ("cosine_distance", "l2_distance", "max_inner_product")
+
+
+class LocalVectorIndex:
+    def __init__(self,
+                 dimension: int,
+                 mode: str = "exact",
+                 n_lists: Optional[int] = None,
+                 n_probe: int = 8,
+                 train_iterations: int = 10):
+        """
+        In-process mirror of a vector collection.
+
+        Vectors live in one contiguous float32 matrix. "exact" mode scores every
+        row with a single matrix-vector product; "approximate" mode clusters rows
+        into n_lists inverted lists (IVF) and only scores the n_probe lists
+        closest to the query.
+
+        :param dimension: Dimension of the vectors
+        :param mode: 'exact' or 'approximate'
+        :param n_lists: Number of IVF lists (default: sqrt of the row count at training time)
+        :param n_probe: Number of IVF lists scanned per query in approximate mode
+        :param train_iterations: k-means iterations used to train the IVF lists
+        """
+        if mode not in ("exact", "approximate"):
+            raise ValueError(f"Unsupported index mode: {mode}")
+        self.dimension = dimension
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+
+        self._lock = threading.RLock()
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+
+    def __len__(self):
+        return self._size
+
+    def ids(self) -> Set[str]:
+        """A snapshot of the ids currently indexed."""
+        with self._lock:
+            return set(self._rows)
+
+    def load(self, records: Iterable[tuple]):
+        """
+        Replace the index contents with the given records and train IVF lists if needed.
+
+        :param records: Iterable of (id, vector, metadata) tuples
+        """
+        with self._lock:
+            self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+            self._norms = np.empty(0, dtype=np.float32)
+            self._ids, self._metadata, self._rows = [], [], {}
+            self._size = 0
+            self._centroids = None
+            self._assignments = np.empty(0, dtype=np.int32)
+            self.upsert(records)
+            if self.mode == "approximate":
+                self.train()
+
+    def upsert(self, records: Iterable[tuple]):
+        """
+        Insert or replace records.
+
+        :param records: Iterable of (id, vector, metadata) tuples
+        """
+        with self._lock:
+            for record in records:
+                id_, vector = record[0], record[1]
+                metadata = record[2] if len(record) > 2 else {}
+                vector = np.asarray(vector, dtype=np.float32)
+                row = self._rows.get(id_)
+                if row is None:
+                    row = self._size
+                    self._ensure_capacity(row + 1)
+                    self._rows[id_] = row
+                    self._ids.append(id_)
+                    self._metadata.append(metadata or {})
+                    self._size += 1
+                else:
+                    self._metadata[row] = metadata or {}
+                self._vectors[row] = vector
+                self._norms[row] = np.linalg.norm(vector)
+                if self._centroids is not None:
+                    self._assignments[row] = self._nearest_lists(vector[None, :], 1)[0, 0]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Remove records by id. The last row is moved into each freed slot.
+
+        :param ids: Ids to remove
+        :return: Number of records removed
+        """
+        removed = 0
+        with self._lock:
+            for id_ in ids:
+                row = self._rows.pop(id_, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._norms[row] = self._norms[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[moved_id] = row
+                    if self._centroids is not None:
+                        self._assignments[row] = self._assignments[last]
+                self._ids.pop()
+                self._metadata.pop()
+                self._size -= 1
+                removed += 1
+        return removed
+
+    def train(self):
+        """Cluster the current rows into IVF lists with a few rounds of k-means."""
+        with self._lock:
+            if self._size == 0:
+                self._centroids = None
+                return
+            data = self._normalized(self._vectors[:self._size], self._norms[:self._size])
+            n_lists = min(self.n_lists or max(1, int(np.sqrt(self._size))), self._size)
+            rng = np.random.default_rng(0)
+            centroids = data[rng.choice(self._size, n_lists, replace=False)].copy()
+            for _ in range(self.train_iterations):
+                assignments = np.argmax(data @ centroids.T, axis=1)
+                for i in range(n_lists):
+                    members = data[assignments == i]
+                    if len(members):
+                        centroids[i] = members.mean(axis=0)
+                centroids = self._normalized(centroids, np.linalg.norm(centroids, axis=1))
+            self._centroids = centroids
+            self._assignments = np.empty(len(self._vectors), dtype=np.int32)
+            self._assignments[:self._size] = np.argmax(data @ centroids.T, axis=1)
+
+    def query(self,
+              query_vector: Union[List[float], np.ndarray],
+              limit: int = 5,
+              measure: str = "cosine_distance",
+              include_value: bool = True,
+              include_metadata: bool = True,
+              n_probe: Optional[int] = None) -> list:
+        """
+        Nearest-neighbour search returning rows shaped like vecs query results.
+
+        :param query_vector: The query vector
+        :param limit: Number of results to return
+        :param measure: Distance measure to use
+        :param include_value: Include distance values in results
+        :param include_metadata: Include metadata in results
+        :param n_probe: IVF lists scanned for this query (default: the index's n_probe)
+        :return: List of ids, or of (id, [distance], [metadata]) tuples
+        """
+        with self._lock:
+            rows, distances = self._search(np.asarray(query_vector, dtype=np.float32), limit, measure, n_probe)
+            if not include_value and not include_metadata:
+                return [self._ids[r] for r in rows]
+            results = []
+            for row, distance in zip(rows, distances):
+                item = (self._ids[row],)
+                if include_value:
+                    item += (float(distance),)
+                if include_metadata:
+                    item += (self._metadata[row],)
+                results.append(item)
+            return results
+
+    def query_batch(self,
+                    query_vectors: List[Union[List[float], np.ndarray]],
+                    limit: int = 5,
+                    measure: str = "cosine_distance",
+                    n_probe: Optional[int] = None) -> List[List[tuple]]:
+        """
+        Run several searches, returning one list of (id, distance) tuples per query.
+        """
+        with self._lock:
+            results = []
+            for vector in query_vectors:
+                rows, distances = self._search(np.asarray(vector, dtype=np.float32), limit, measure, n_probe)
+                results.append([(self._ids[r], float(d)) for r, d in zip(rows, distances)])
+            return results
+
+    def query_radius(self,
+                     query_vector: Union[List[float], np.ndarray],
+                     radius: float,
+                     measure: str = "cosine_distance",
+                     max_results: Optional[int] = None,
+                     n_probe: Optional[int] = None) -> List[tuple]:
+        """
+        Every row within a distance radius of the query, nearest first.
+
+        :param query_vector: The query vector
+        :param radius: Maximum distance (inclusive)
+        :param measure: Distance measure to use
+        :param max_results: Keep at most this many of the nearest matches
+        :param n_probe: IVF lists scanned in approximate mode (default: the index's n_probe)
+        :return: List of (id, distance) tuples ordered by distance, then id
+        """
+        if measure not in MEASURES:
+            raise ValueError(f"Unsupported measure: {measure}")
+        with self._lock:
+            if self._size == 0:
+                return []
+            candidates, distances = self._distances(np.asarray(query_vector, dtype=np.float32), measure, n_probe)
+            within = np.flatnonzero(distances <= radius)
+            rows = within if candidates is None else candidates[within]
+            matches = sorted(zip(distances[within].tolist(), (self._ids[r] for r in rows)))
+            return [(id_, distance) for distance, id_ in matches[:max_results]]
+
+    def query_radius_batch(self,
+                           query_vectors: List[Union[List[float], np.ndarray]],
+                           radius: float,
+                           measure: str = "cosine_distance",
+                           max_results: Optional[int] = None) -> List[List[tuple]]:
+        """
+        Range search for several queries at once, scoring every row in one matrix product.
+
+        The search is exact in both modes; it is meant for matching a batch
+        against a small index, such as new videos against the keyword collection.
+
+        :param query_vectors: The query vectors
+        :param radius: Maximum distance (inclusive)
+        :param measure: Distance measure to use
+        :param max_results: Keep at most this many of the nearest matches per query
+        :return: One list of (id, distance) tuples per query vector, nearest first
+        """
+        if measure not in MEASURES:
+            raise ValueError(f"Unsupported measure: {measure}")
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in range(len(queries))]
+            distances = self._pairwise(queries, self._vectors[:self._size], self._norms[:self._size], measure)
+            results = []
+            for row_distances in distances:
+                within = np.flatnonzero(row_distances <= radius)
+                matches = sorted(zip(row_distances[within].tolist(), (self._ids[r] for r in within)))
+                results.append([(id_, distance) for distance, id_ in matches[:max_results]])
+            return results
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index, including ids and metadata."""
+        with self._lock:
+            total = self._vectors.nbytes + self._norms.nbytes + self._assignments.nbytes
+            if self._centroids is not None:
+                total += self._centroids.nbytes
+            # Rough per-entry cost of the id string, the id->row dict slot and list pointers
+            total += sum(len(id_) + 49 + 8 + 104 for id_ in self._ids)
+            return total
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "vectors": self._size,
+            "lists": 0 if self._centroids is None else len(self._centroids),
+            "memory_bytes": self.memory_bytes()
+        }
+
+    def _search(self, query: np.ndarray, limit: int, measure: str, n_probe: Optional[int] = None):
+        if measure not in MEASURES:
+            raise ValueError(f"Unsupported measure: {measure}")
+        if self._size == 0 or limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates, distances = self._distances(query, measure, n_probe)
+        k = min(limit, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        rows = top if candidates is None else candidates[top]
+        return rows, distances[top]
+
+    def _distances(self, query: np.ndarray, measure: str, n_probe: Optional[int] = None):
+        """Distances to every row, or to the rows of the probed IVF lists (candidates)."""
+        if self.mode == "approximate" and self._centroids is not None:
+            probe = self._nearest_lists(query[None, :], n_probe or self.n_probe)[0]
+            candidates = np.flatnonzero(np.isin(self._assignments[:self._size], probe))
+        else:
+            candidates = None
+
+        vectors = self._vectors[:self._size] if candidates is None else self._vectors[candidates]
+        norms = self._norms[:self._size] if candidates is None else self._norms[candidates]
+        return candidates, self._pairwise(query[None, :], vectors, norms, measure)[0]
+
+    @staticmethod
+    def _pairwise(queries: np.ndarray, vectors: np.ndarray, norms: np.ndarray, measure: str) -> np.ndarray:
+        """Distance matrix of shape (queries, rows), from one matrix product."""
+        dots = queries @ vectors.T
+        if measure == "cosine_distance":
+            query_norms = np.linalg.norm(queries, axis=1)
+            return 1.0 - dots / np.maximum(query_norms[:, None] * norms[None, :], 1e-12)
+        if measure == "l2_distance":
+            squared = (queries ** 2).sum(axis=1)[:, None] - 2 * dots + (norms ** 2)[None, :]
+            return np.sqrt(np.maximum(squared, 0.0))
+        return -dots
+
+    def _nearest_lists(self, vectors: np.ndarray, n: int) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1)
+        scores = self._normalized(vectors, norms) @ self._centroids.T
+        n = min(n, len(self._centroids))
+        return np.argsort(-scores, axis=1)[:, :n]
+
+    def _ensure_capacity(self, size: int):
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+        vectors = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        norms = np.empty(new_capacity, dtype=np.float32)
+        norms[:self._size] = self._norms[:self._size]
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._norms, self._assignments = vectors, norms, assignments
+
+    @staticmethod
+    def _normalized(vectors: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(norms, 1e-12)[:, None]